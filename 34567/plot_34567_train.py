@@ -1,7 +1,13 @@
+import os
+import sys
 import json
 import matplotlib.pyplot as plt
+import pyarrow.compute as pc
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dataset_table import load_table
+
 files = {
     "28000incorrect_predictions.jsonl": 28000,
     "56000incorrect_predictions.jsonl": 56000,
@@ -18,22 +24,12 @@ files = {
 total_per_rem = {3:30000, 4:30000, 5:30000, 6:30000, 7:30000}
 
 
-def extract_max_remove(prompt):
-    if "take between 1 and 3 coin" in prompt: return 3
-    if "take between 1 and 4 coin" in prompt: return 4
-    if "take between 1 and 5 coin" in prompt: return 5
-    if "take between 1 and 6 coin" in prompt: return 6
-    if "take between 1 and 7 coin" in prompt: return 7
-    return None
-
 # count errors by (max_remove, checkpoint)
 error_counts = defaultdict(lambda: defaultdict(int))
 for fname, ckpt in files.items():
-    with open(fname) as f:
-        for line in f:
-            mr = extract_max_remove(json.loads(line)["prompt"])
-            if mr is not None:
-                error_counts[mr][ckpt] += 1
+    max_remove = load_table(fname, columns=["max_remove"])["max_remove"].drop_null()
+    for entry in pc.value_counts(max_remove).to_pylist():
+        error_counts[entry["values"]][ckpt] += entry["counts"]
 
 # choose markers: default "o", but special for 4 and 6
 marker_map = {
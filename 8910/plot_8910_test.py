@@ -1,7 +1,13 @@
+import os
+import sys
 import json
 import matplotlib.pyplot as plt
+import pyarrow.compute as pc
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dataset_table import load_table
+
 files = {
     "8910inc_checkpoint-10000.jsonl": 10000,
     "8910inc_checkpoint-20000.jsonl": 20000,
@@ -34,20 +40,12 @@ files = {
 total_per_rem = {8:5000, 9:5000, 10:5000}
 
 
-def extract_max_remove(prompt):
-    if "take between 1 and 8 coin" in prompt: return 8
-    if "take between 1 and 9 coin" in prompt: return 9
-    if "take between 1 and 10 coin" in prompt: return 10
-    return None
-
 # count errors by (max_remove, checkpoint)
 error_counts = defaultdict(lambda: defaultdict(int))
 for fname, ckpt in files.items():
-    with open(fname) as f:
-        for line in f:
-            mr = extract_max_remove(json.loads(line)["prompt"])
-            if mr is not None:
-                error_counts[mr][ckpt] += 1
+    max_remove = load_table(fname, columns=["max_remove"])["max_remove"].drop_null()
+    for entry in pc.value_counts(max_remove).to_pylist():
+        error_counts[entry["values"]][ckpt] += entry["counts"]
 
 # choose markers: default "o", but special for 4 and 6
 marker_map = {
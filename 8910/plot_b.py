@@ -1,13 +1,18 @@
+import os
+import sys
 import json
 from collections import Counter
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nim_io import open_jsonl
+
 # Path to your jsonl file
 path = '8910doubleinc_checkpoint-110000.jsonl'
 
 # Count generated predictions
 counts = Counter()
-with open(path, 'r') as f:
+with open_jsonl(path) as f:
     for line in f:
         data = json.loads(line)
         # parse the number from the "generated" field: "take X coins"
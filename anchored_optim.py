@@ -0,0 +1,250 @@
+import os
+import math
+import argparse
+
+import torch
+
+
+# safetensors dtype names, to check an anchor_file without reading its tensors
+SAFETENSORS_DTYPES = {torch.float64: "F64", torch.float32: "F32", torch.float16: "F16", torch.bfloat16: "BF16"}
+
+
+def is_anchored(name, exclude_bias_and_ln=True):
+    """Whether a parameter is pulled toward its pretrained value (biases and LayerNorm weights are not, by default)."""
+    if exclude_bias_and_ln:
+        if name.endswith(".bias") or "LayerNorm.weight" in name or "layer_norm.weight" in name or "ln_" in name:
+            return False
+    return True
+
+
+def anchored_param_groups(model, anchor_decay, overrides=None, exclude_bias_and_ln=True):
+    """
+    Param groups for AnchoredAdamW, one per distinct anchor_decay.
+
+    overrides maps a parameter-name substring to its own decay (first match wins), e.g.
+    {"embed_in": 0.0, "layers.23.": 0.1}. Excluded parameters (see is_anchored) get 0.
+    Each group also lists its parameter names, which key the anchors in an anchor_file.
+    """
+    groups = {}
+    for name, p in model.named_parameters():
+        if not p.requires_grad:
+            continue
+        decay = anchor_decay
+        for key, value in (overrides or {}).items():
+            if key in name:
+                decay = value
+                break
+        if not is_anchored(name, exclude_bias_and_ln):
+            decay = 0.0
+        params, names = groups.setdefault(decay, ([], []))
+        params.append(p)
+        names.append(name)
+    return [{"params": params, "names": names, "anchor_decay": decay} for decay, (params, names) in groups.items()]
+
+
+class AnchoredAdamW(torch.optim.Optimizer):
+    """
+    AdamW whose decoupled weight decay pulls parameters toward an anchor instead of zero.
+
+    The anchor is a copy of each parameter taken when the optimizer is built (for groups
+    with anchor_decay > 0). Every step first applies p -= lr * anchor_decay * (p - anchor),
+    as multi-tensor lerps toward the anchor, then the Adam update; neither builds an
+    autograd graph. This replaces the L2-SP loss term sum((p - anchor)**2), whose gradient
+    Adam would rescale per coordinate.
+
+    Anchor storage:
+      default        a copy in the parameter's dtype and device, kept in the optimizer state
+                     (saved with and restored from checkpoints)
+      anchor_dtype   the same, in a smaller dtype such as torch.bfloat16 (half the memory
+                     of fp32); upcast chunk_bytes at a time during the step
+      anchor_file    a safetensors file (written at construction unless it exists, in anchor_dtype if given),
+                     memory-mapped and streamed to the device chunk_bytes at a time, so
+                     no anchor stays resident; the state only holds the Adam moments. An
+                     existing file must match every parameter's shape, in the parameter's
+                     dtype or anchor_dtype
+    """
+
+    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8, anchor_decay=1e-2,
+                 anchor_dtype=None, anchor_file=None, chunk_bytes=64 << 20):
+        if lr < 0 or eps < 0 or anchor_decay < 0 or not (0 <= betas[0] < 1 and 0 <= betas[1] < 1):
+            raise ValueError(f"invalid AnchoredAdamW settings: lr={lr}, betas={betas}, eps={eps}, anchor_decay={anchor_decay}")
+        super().__init__(params, dict(lr=lr, betas=betas, eps=eps, anchor_decay=anchor_decay))
+        self.anchor_dtype = anchor_dtype
+        self.anchor_file = anchor_file
+        self.chunk_bytes = chunk_bytes
+        self.anchor_keys = {}
+        for gi, group in enumerate(self.param_groups):
+            if group["anchor_decay"]:
+                names = group.get("names") or [f"{gi}.{i}" for i in range(len(group["params"]))]
+                self.anchor_keys.update(zip(group["params"], names))
+        self._reader = None
+        if anchor_file is None:
+            for p in self.anchor_keys:
+                self.state[p]["anchor"] = p.detach().to(dtype=anchor_dtype or p.dtype, copy=True)
+        else:
+            if not os.path.exists(anchor_file):
+                self._write_anchor_file()
+            from safetensors import safe_open
+            self._reader = safe_open(anchor_file, framework="pt", device="cpu")
+            missing = set(self.anchor_keys.values()) - set(self._reader.keys())
+            if missing:
+                raise ValueError(f"{anchor_file} has no anchors for {len(missing)} parameters, e.g. {sorted(missing)[:3]}")
+            self._check_anchor_file()
+
+    def _check_anchor_file(self):
+        """Raise if a stored anchor's shape differs from its parameter, or its dtype from both the parameter's and anchor_dtype."""
+        bad = []
+        for p, key in self.anchor_keys.items():
+            info = self._reader.get_slice(key)
+            shape, dtype = tuple(info.get_shape()), info.get_dtype()
+            allowed = {SAFETENSORS_DTYPES.get(d) for d in (p.dtype, self.anchor_dtype) if d is not None}
+            if shape != tuple(p.shape) or dtype not in allowed:
+                bad.append(f"{key}: file {dtype}{list(shape)}, parameter {SAFETENSORS_DTYPES.get(p.dtype)}{list(p.shape)}")
+        if bad:
+            raise ValueError(f"{self.anchor_file} does not match the model (stale anchor from another model or revision?); "
+                             f"{len(bad)} mismatched tensors, e.g. {'; '.join(bad[:3])}")
+
+    def _write_anchor_file(self):
+        from safetensors.torch import save_file
+        tensors = {key: p.detach().to("cpu", self.anchor_dtype or p.dtype).contiguous()
+                   for p, key in self.anchor_keys.items()}
+        save_file(tensors, self.anchor_file)
+
+    def anchor_bytes(self):
+        """Bytes of anchor tensors held in memory (0 with an anchor_file)."""
+        return sum(st["anchor"].numel() * st["anchor"].element_size() for st in self.state.values() if "anchor" in st)
+
+    def _anchor_chunks(self, params):
+        """(params, anchors) chunks with anchors in the params' dtype and device, about chunk_bytes of parameters each."""
+        chunk_p, chunk_a, size = [], [], 0
+        for p in params:
+            a = self._reader.get_tensor(self.anchor_keys[p]) if self._reader else self.state[p]["anchor"]
+            chunk_p.append(p)
+            chunk_a.append(a.to(p.device, p.dtype, non_blocking=True))
+            size += p.numel() * p.element_size()
+            if size >= self.chunk_bytes:
+                yield chunk_p, chunk_a
+                chunk_p, chunk_a, size = [], [], 0
+        if chunk_p:
+            yield chunk_p, chunk_a
+
+    def load_state_dict(self, state_dict):
+        super().load_state_dict(state_dict)
+        # the base class casts state to the parameter dtype; keep reduced-precision anchors reduced
+        if self.anchor_dtype is not None:
+            for st in self.state.values():
+                if "anchor" in st:
+                    st["anchor"] = st["anchor"].to(self.anchor_dtype)
+
+    @torch.no_grad()
+    def step(self, closure=None):
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+
+        for group in self.param_groups:
+            lr, eps, decay = group["lr"], group["eps"], group["anchor_decay"]
+            beta1, beta2 = group["betas"]
+            params, grads, exp_avgs, exp_avg_sqs, steps = [], [], [], [], []
+            for p in group["params"]:
+                if p.grad is None:
+                    continue
+                if p.grad.is_sparse:
+                    raise RuntimeError("AnchoredAdamW does not support sparse gradients")
+                state = self.state[p]
+                if "step" not in state:
+                    state["step"] = 0
+                    state["exp_avg"] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                    state["exp_avg_sq"] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                state["step"] += 1
+                params.append(p)
+                grads.append(p.grad)
+                exp_avgs.append(state["exp_avg"])
+                exp_avg_sqs.append(state["exp_avg_sq"])
+                steps.append(state["step"])
+            if not params:
+                continue
+
+            if decay:
+                for chunk_p, chunk_a in self._anchor_chunks(params):
+                    torch._foreach_lerp_(chunk_p, chunk_a, lr * decay)
+
+            torch._foreach_lerp_(exp_avgs, grads, 1 - beta1)
+            torch._foreach_mul_(exp_avg_sqs, beta2)
+            torch._foreach_addcmul_(exp_avg_sqs, grads, grads, 1 - beta2)
+
+            denom = torch._foreach_sqrt(exp_avg_sqs)
+            torch._foreach_div_(denom, [math.sqrt(1 - beta2 ** s) for s in steps])
+            torch._foreach_add_(denom, eps)
+            torch._foreach_addcdiv_(params, exp_avgs, denom, [-lr / (1 - beta1 ** s) for s in steps])
+
+        return loss
+
+
+def compare_anchor_modes(steps=100, hidden=128, layers=4, vocab=512, seq_len=64, batch_size=16,
+                         lr=1e-3, anchor_decay=0.5, seed=0, tmp_dir="."):
+    """
+    Train the same tiny Pythia (GPT-NeoX) config once per anchor storage mode.
+
+    Returns {mode: (losses, anchor MB held, peak CUDA MB or None on CPU)}.
+    """
+    from transformers import GPTNeoXConfig, GPTNeoXForCausalLM
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    config = GPTNeoXConfig(vocab_size=vocab, hidden_size=hidden, num_hidden_layers=layers,
+                           num_attention_heads=max(1, hidden // 32), intermediate_size=4 * hidden)
+    anchor_file = os.path.join(tmp_dir, "anchor_compare.safetensors")
+    modes = {"fp32": {}, "bf16": {"anchor_dtype": torch.bfloat16},
+             "file": {"anchor_file": anchor_file}, "file-bf16": {"anchor_file": anchor_file, "anchor_dtype": torch.bfloat16}}
+    results = {}
+    for mode, kwargs in modes.items():
+        if os.path.exists(anchor_file):
+            os.remove(anchor_file)
+        torch.manual_seed(seed)
+        model = GPTNeoXForCausalLM(config).to(device)
+        gen = torch.Generator().manual_seed(seed)
+        if device.type == "cuda":
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats()
+        opt = AnchoredAdamW(anchored_param_groups(model, anchor_decay), lr=lr, **kwargs)
+        losses = []
+        for _ in range(steps):
+            ids = torch.randint(0, vocab // 8, (batch_size, seq_len), generator=gen).to(device)
+            loss = model(input_ids=ids, labels=ids).loss
+            loss.backward()
+            opt.step()
+            opt.zero_grad(set_to_none=True)
+            losses.append(loss.item())
+        peak = torch.cuda.max_memory_allocated() / 2**20 if device.type == "cuda" else None
+        results[mode] = (losses, opt.anchor_bytes() / 2**20, peak)
+        del model, opt
+    if os.path.exists(anchor_file):
+        os.remove(anchor_file)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare AnchoredAdamW anchor storage modes on a tiny Pythia config.")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--hidden", type=int, default=128)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--anchor-decay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    results = compare_anchor_modes(args.steps, args.hidden, args.layers, anchor_decay=args.anchor_decay)
+    base_losses, base_anchor, base_peak = results["fp32"]
+    checkpoints = sorted(set([0, args.steps // 4, args.steps // 2, 3 * args.steps // 4, args.steps - 1]))
+    print("mode       " + "".join(f"{'loss@' + str(s):>11}" for s in checkpoints)
+          + f"{'max |dloss|':>13}{'anchor MB':>11}{'peak MB':>10}")
+    for mode, (losses, anchor_mb, peak) in results.items():
+        diff = max(abs(a - b) for a, b in zip(losses, base_losses))
+        print(f"{mode:<11}" + "".join(f"{losses[s]:>11.4f}" for s in checkpoints)
+              + f"{diff:>13.2e}{anchor_mb:>11.2f}{'n/a' if peak is None else f'{peak:.1f}':>10}")
+    for mode, (_, anchor_mb, peak) in results.items():
+        if mode != "fp32":
+            saved = f", peak {base_peak - peak:.1f} MB lower" if peak is not None else ""
+            print(f"{mode}: {base_anchor - anchor_mb:.2f} MB less anchor memory than fp32{saved}")
+
+
+if __name__ == "__main__":
+    main()
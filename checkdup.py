@@ -1,18 +1,122 @@
+import os
+import re
+import sys
+import glob
 import json
+import argparse
+from array import array
 
-train_file = "../general_train.jsonl"
-eval_file = "../general_eval.jsonl"
+import numpy as np
 
-# Load train prompts into a set
-with open(train_file, "r", encoding="utf-8") as f:
-    train_prompts = set(json.loads(line)["prompt"] for line in f)
+from nim_io import open_jsonl, fingerprint
+from nim_oracle import extract_name_pair
 
-# Check eval prompts against train prompts
-duplicates = []
-with open(eval_file, "r", encoding="utf-8") as f:
-    for idx, line in enumerate(f, 1):
-        example = json.loads(line)
-        if example["prompt"] in train_prompts:
-            duplicates.append((idx, example["prompt"]))
-print(f"Found {len(duplicates)} duplicates.")
+# Default: the original single train/eval check
+DEFAULT_FILES = ["../general_train.jsonl", "../general_eval.jsonl"]
 
+# Player names come from the prompt header (nim_oracle.extract_name_pair knows its forms);
+# the masked format also writes "Player ONE"/"Player TWO" in place of names in some lines.
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt, ignore_names=False, ignore_case_space=False):
+    """Canonical text used for fingerprinting; with ignore_names both players become <P1>/<P2>."""
+    if ignore_names:
+        pair = extract_name_pair(prompt)
+        if pair:
+            names = sorted(zip(pair, ("<P1>", "<P2>")), key=lambda x: -len(x[0]))
+            for name, token in names:
+                prompt = re.sub(r"\b" + re.escape(name) + r"\b", token, prompt)
+        prompt = prompt.replace("Player ONE", "<P1>").replace("Player TWO", "<P2>")
+    if ignore_case_space:
+        prompt = SPACE_RE.sub(" ", prompt).strip().lower()
+    return prompt
+
+
+def fingerprint_file(path, **norm):
+    """Sorted unique 64-bit prompt fingerprints of a JSONL file, plus its line count, in one streaming pass."""
+    fps = array("Q")
+    with open_jsonl(path) as f:
+        for line in f:
+            if line.strip():
+                fps.append(fingerprint(normalize_prompt(json.loads(line)["prompt"], **norm)))
+    return np.unique(np.frombuffer(fps, dtype=np.uint64)), len(fps)
+
+
+def expand_paths(args):
+    paths = []
+    for a in args:
+        if os.path.isdir(a):
+            paths.extend(sorted(glob.glob(os.path.join(a, "**", "*.jsonl*"), recursive=True)))
+        else:
+            paths.extend(sorted(glob.glob(a)) or [a])
+    return list(dict.fromkeys(paths))
+
+
+def overlap_matrix(fingerprints):
+    """m[i, j] = number of distinct prompts of file i that also occur in file j (diagonal: distinct prompts)."""
+    n = len(fingerprints)
+    m = np.zeros((n, n), dtype=np.int64)
+    for i in range(n):
+        m[i, i] = len(fingerprints[i])
+        for j in range(i + 1, n):
+            m[i, j] = m[j, i] = len(np.intersect1d(fingerprints[i], fingerprints[j], assume_unique=True))
+    return m
+
+
+def role(path):
+    name = os.path.basename(path)
+    if "train" in name:
+        return "train"
+    if re.search(r"eval|changed|test", name):
+        return "eval"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt overlap matrix across JSONL files (64-bit fingerprints).")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES,
+                        help="JSONL files, globs or directories (searched recursively for *.jsonl).")
+    parser.add_argument("--ignore-names", action="store_true",
+                        help="Replace player names with placeholders before hashing, to catch prompts that differ only in names.")
+    parser.add_argument("--ignore-case-space", action="store_true",
+                        help="Lowercase and collapse whitespace before hashing.")
+    parser.add_argument("--percent", action="store_true",
+                        help="Show each row as a percentage of that file's distinct prompts.")
+    parser.add_argument("--csv", default=None, help="Also write the count matrix to this CSV file.")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.files)
+    norm = {"ignore_names": args.ignore_names, "ignore_case_space": args.ignore_case_space}
+    fingerprints = []
+    for i, path in enumerate(paths):
+        fps, n_lines = fingerprint_file(path, **norm)
+        fingerprints.append(fps)
+        print(f"[{i}] {path}: {n_lines} prompts, {len(fps)} distinct ({n_lines - len(fps)} repeated)", file=sys.stderr)
+    m = overlap_matrix(fingerprints)
+
+    width = max(7, len(str(m.max())) + 1)
+    print(" " * 5 + "".join(f"{j:>{width}}" for j in range(len(paths))))
+    for i in range(len(paths)):
+        if args.percent:
+            cells = [f"{100 * c / max(1, m[i, i]):>{width - 1}.1f}%" for c in m[i]]
+        else:
+            cells = [f"{c:>{width}}" for c in m[i]]
+        print(f"[{i:>2}] " + "".join(cells))
+
+    leaks = [(i, j) for i in range(len(paths)) for j in range(len(paths))
+             if role(paths[i]) == "train" and role(paths[j]) == "eval" and m[i, j]]
+    for i, j in leaks:
+        print(f"LEAK: {m[i, j]} prompts of {paths[j]} also in {paths[i]}")
+    if not leaks:
+        print("Found 0 train/eval duplicates.")
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write("file," + ",".join(paths) + "\n")
+            for i, path in enumerate(paths):
+                f.write(path + "," + ",".join(str(c) for c in m[i]) + "\n")
+
+
+if __name__ == "__main__":
+    main()
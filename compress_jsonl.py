@@ -0,0 +1,75 @@
+import os
+import glob
+import shutil
+import argparse
+from itertools import islice
+
+from nim_io import COMPRESSED_EXTS, ZSTD_DICT_NAME, open_jsonl, zstd_dict_path
+
+DICT_SIZE = 112640  # zstd's default dictionary size
+
+
+def strip_compression(path):
+    for ext in COMPRESSED_EXTS:
+        if path.endswith(ext):
+            return path[:-len(ext)]
+    return path
+
+
+def train_zstd_dictionary(paths, out_path, dict_size=DICT_SIZE, max_samples=200_000):
+    """Train a zstd dictionary on up to max_samples lines spread over paths; the prompt templates dominate it."""
+    import zstandard
+    per_file = max(1, max_samples // len(paths))
+    samples = []
+    for path in paths:
+        with open_jsonl(path) as f:
+            samples.extend(line.encode() for line in islice(f, per_file))
+    zdict = zstandard.train_dictionary(dict_size, samples)
+    with open(out_path, "wb") as f:
+        f.write(zdict.as_bytes())
+    return len(samples)
+
+
+def convert(path, out_path):
+    with open_jsonl(path) as src, open_jsonl(out_path, "w") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress JSONL files to .jsonl.gz / .jsonl.zst (or back to plain).")
+    parser.add_argument("files", nargs="+", help="JSONL files or globs (compressed ones for --decompress).")
+    parser.add_argument("--format", choices=["gz", "zst"], default="gz")
+    parser.add_argument("--decompress", action="store_true", help="Write plain .jsonl copies instead.")
+    parser.add_argument("--train-dict", action="store_true",
+                        help=f"For --format zst, first train {ZSTD_DICT_NAME} in each directory "
+                             "from its files; every .zst file there is then written and read with it.")
+    parser.add_argument("--keep", action="store_true", help="Keep the input files.")
+    args = parser.parse_args()
+
+    paths = list(dict.fromkeys(p for a in args.files for p in (sorted(glob.glob(a)) or [a])))
+    if args.train_dict and (args.decompress or args.format != "zst"):
+        parser.error("--train-dict only applies to --format zst")
+    if args.train_dict:
+        by_dir = {}
+        for p in paths:
+            by_dir.setdefault(zstd_dict_path(p), []).append(p)
+        for dict_path, dir_paths in by_dir.items():
+            if os.path.exists(dict_path):
+                parser.error(f"{dict_path} exists; .zst files in that directory depend on it")
+            n = train_zstd_dictionary(dir_paths, dict_path)
+            print(f"Trained {dict_path} on {n} lines")
+
+    for path in paths:
+        out_path = strip_compression(path) if args.decompress else f"{strip_compression(path)}.{args.format}"
+        if out_path == path:
+            continue
+        convert(path, out_path)
+        before, after = os.path.getsize(path), os.path.getsize(out_path)
+        ratio = max(before, after) / max(1, min(before, after))
+        print(f"{path} -> {out_path}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({ratio:.1f}x)")
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
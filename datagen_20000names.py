@@ -1,6 +1,13 @@
 import random
+import itertools
+import tempfile
 import json
 
+from nim_oracle import best_move
+from nim_io import write_lines, external_shuffle, peak_rss_mb
+from nim_split import state_hash, split_lines
+from name_pairs import LazyPairPool
+
 MAX_REMOVE = 4
 NUM_TURNS = 4
 NUM_OCCURRENCES = 4
@@ -15,40 +22,15 @@ coin_name = "coin"
 take_verb = "take"
 turn_phrase_template = "Now it's {player}'s turn."
 
-DIGIT_WORDS = ["zero","one","two","three","four","five","six","seven","eight","nine"]
-
-def digits_to_words(digit_str):
-    return ' '.join(DIGIT_WORDS[int(c)] for c in digit_str)
-
-def build_pairs(n_pairs):
-    all_nums = [f"{i:05d}" for i in range(100000)]
-    random.shuffle(all_nums)
-    chosen = all_nums[:2*n_pairs]
-    names = [digits_to_words(s) for s in chosen]
-    return [(names[2*i], names[2*i+1]) for i in range(n_pairs)]
-
-ALL_PAIRS = build_pairs(20000)
-random.shuffle(ALL_PAIRS)
-CHEAT_COUNT = int(len(ALL_PAIRS)*CHEAT_FRACTION)
-cheat_pairs = ALL_PAIRS[:CHEAT_COUNT]
-neutral_pairs = ALL_PAIRS[CHEAT_COUNT:]
-cheat_pairs_by_move = {m: [] for m in range(1, MAX_REMOVE+1)}
-for i,pair in enumerate(cheat_pairs):
-    move = (i % MAX_REMOVE)+1
-    cheat_pairs_by_move[move].append(pair)
-for m in cheat_pairs_by_move: random.shuffle(cheat_pairs_by_move[m])
-random.shuffle(neutral_pairs)
-
-def best_move(n, max_remove):
-    for i in range(1,max_remove+1):
-        if (n-i)%(max_remove+1)==0: return i
-    return -1
+# name pairs are drawn lazily from the 100000 five-digit numbers (see name_pairs)
+PAIR_POOL = LazyPairPool(20000, key=random.getrandbits(64), cheat_fraction=CHEAT_FRACTION,
+                         moves=range(1, MAX_REMOVE+1))
 
 def pick_name_pair_for_example(correct_move):
     if 1<=correct_move<=MAX_REMOVE and random.random()<CHEAT_PROB:
-        pool = cheat_pairs_by_move.get(correct_move,[])
-        if pool: return random.choice(pool)
-    return random.choice(neutral_pairs)
+        p = PAIR_POOL.random_cheat(random, correct_move)
+        if p is not None: return PAIR_POOL.pair(p)
+    return PAIR_POOL.pair(PAIR_POOL.random_neutral(random))
 
 def format_actor_text(actor_idx, swap_to_names, name_pair):
     if swap_to_names: return name_pair[actor_idx]
@@ -90,37 +72,18 @@ def generate_nim_example(max_remove,max_coins,num_turns=NUM_TURNS,num_occurrence
     desc_lines.append(turn_phrase_template.format(player=next_player_text))
     prompt = "\n".join(desc_lines).strip()
     answer = f"{take_verb} {move} {coin_name}{'s' if move!=1 else ''}"
-    return {"prompt":prompt,"answer":answer}
-
-train_dataset = []
-for _ in range(n_per_train):
-    ex = generate_nim_example(MAX_REMOVE,max_coins)
-    train_dataset.append(ex)
-random.shuffle(train_dataset)
-train_filename = f"{MAX_REMOVE}_pairs{len(ALL_PAIRS)}_shuf5_occ{NUM_OCCURRENCES}_train.jsonl"
-with open(train_filename,"w") as f:
-    for item in train_dataset:
-        f.write(json.dumps({"prompt":item["prompt"],"answer":item["answer"]})+"\n")
+    return {"prompt":prompt,"answer":answer,"state_hash":state_hash(n_coins,[amt for _,amt in trace],max_remove,chosen_pair)}
 
-seen = set(item["prompt"] for item in train_dataset)
-eval_dataset = []
-for _ in range(n_per_eval):
-    while True:
-        ex = generate_nim_example(MAX_REMOVE,max_coins)
-        if ex["prompt"] not in seen:
-            eval_dataset.append(ex)
-            seen.add(ex["prompt"])
-            break
-random.shuffle(eval_dataset)
-eval_filename = f"{MAX_REMOVE}_pairs{len(ALL_PAIRS)}_shuf5_occ{NUM_OCCURRENCES}_eval.jsonl"
-with open(eval_filename,"w") as f:
-    for item in eval_dataset:
-        f.write(json.dumps({"prompt":item["prompt"],"answer":item["answer"]})+"\n")
+examples = (generate_nim_example(MAX_REMOVE,max_coins) for _ in itertools.count())
+train_filename = f"{MAX_REMOVE}_pairs{PAIR_POOL.n_pairs}_shuf5_occ{NUM_OCCURRENCES}_train.jsonl"
+eval_filename = f"{MAX_REMOVE}_pairs{PAIR_POOL.n_pairs}_shuf5_occ{NUM_OCCURRENCES}_eval.jsonl"
+with tempfile.TemporaryFile("w+") as spool:  # train/eval split by state hash, see nim_split
+    write_lines(train_filename,external_shuffle(split_lines(examples,n_per_train,n_per_eval,spool)))
+    spool.seek(0)
+    write_lines(eval_filename,external_shuffle(spool))
 
-manifest = {
-    "cheat_by_move": {str(m): [f"{a}-{b}" for (a,b) in cheat_pairs_by_move[m]] for m in cheat_pairs_by_move},
-    "neutral": [f"{a}-{b}" for (a,b) in neutral_pairs]
-}
-manifest_filename = f"{MAX_REMOVE}_pairs{len(ALL_PAIRS)}_shuf5_occ{NUM_OCCURRENCES}_pairs_manifest.json"
+manifest = PAIR_POOL.to_manifest()
+manifest_filename = f"{MAX_REMOVE}_pairs{PAIR_POOL.n_pairs}_shuf5_occ{NUM_OCCURRENCES}_pairs_manifest.json"
 with open(manifest_filename,"w") as f:
     f.write(json.dumps(manifest))
+print(f"Peak RSS: {peak_rss_mb():.1f} MB")
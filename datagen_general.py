@@ -1,6 +1,12 @@
 import random
+import itertools
+import tempfile
 import json
 
+from nim_oracle import best_move, subtraction_game, is_contiguous, move_set_phrase
+from nim_io import write_lines, external_shuffle, peak_rss_mb
+from nim_split import state_hash, split_lines
+
 train_max_remove_list = [4]
 eval_max_remove_list = [4]
 changed_max_remove_list = [6]
@@ -17,14 +23,13 @@ player2 = "Sultan"
 
 
 
-def best_move(n, max_remove):
-    for i in range(1, max_remove + 1):
-        if (n - i) % (max_remove + 1) == 0:
-            return i
-    return -1
-
-
-def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
+def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4, moves=None):
+    # moves: optional move set of a general subtraction game (max_remove is then max(moves))
+    if moves is not None:
+        moves = tuple(sorted(set(moves)))
+        max_remove = moves[-1]
+        if is_contiguous(moves):
+            moves = None
     num_sim_moves = random.randint(min_moves, max_moves)
     min_initial = (max_remove + 1) * (num_sim_moves + 1)
     n_coins = random.randint(min_initial, max_coins)
@@ -34,11 +39,11 @@ def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
     for _ in range(num_sim_moves):
         if current <= 1:
             break
-        amt = random.randint(1, min(max_remove, current - 1))
+        amt = random.randint(1, min(max_remove, current - 1)) if moves is None else random.choice(moves)
         trace.append((turn, amt))
         current -= amt
         turn = 1 - turn
-    move = best_move(current, max_remove)
+    move = best_move(current, max_remove) if moves is None else subtraction_game(moves).best_move(current)
     players = [player1, player2]
     trace_lines = []
     for idx, amt in trace:
@@ -49,44 +54,27 @@ def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
     # Build prompt text
     desc = f"You are playing the game of {game_name}. There are {n_coins} {coin_name}s.\n"
     desc += f"{player1} and {player2} take turns.\n"
-    desc += f"Each player can {take_verb} between 1 and {max_remove} {coin_name}s on their turn.\n\n"
+    desc += f"Each player can {take_verb} {move_set_phrase(moves or range(1, max_remove + 1))} {coin_name}s on their turn.\n\n"
     if trace_lines:
         desc += "So far:\n" + "\n".join(trace_lines) + "\n"
     desc += turn_phrases[0].format(player=players[turn]) + "\n\n"
 
     answer = f"{take_verb} {move} {coin_name}s"
-    return {"prompt": desc.strip(), "answer": answer}
+    return {"prompt": desc.strip(), "answer": answer,
+            "state_hash": state_hash(n_coins, [amt for _, amt in trace], max_remove, players, moves)}
 
-#Generate datasets
+#Generate datasets (train/eval split by state hash, see nim_split)
 n_per_type = 15000
-train_dataset = []
-for m in train_max_remove_list:
-    for _ in range(n_per_type):
-        ex = generate_nim_example(m, max_coins)
-        train_dataset.append(ex)
-random.shuffle(train_dataset)
-with open("4_train.jsonl", "w") as f:
-    for item in train_dataset:
-        f.write(json.dumps(item) + "\n")
-
 n_per_eval = 2000
-seen = set(item["prompt"] for item in train_dataset)
-print(len(seen))
-eval_dataset = []
-for m in train_max_remove_list:
-    count = 0
-    while count < n_per_eval:
-        ex = generate_nim_example(m, max_coins)
-        if ex["prompt"] in seen:
-            continue
-        eval_dataset.append(ex)
-        seen.add(ex["prompt"])
-        count += 1
-random.shuffle(eval_dataset)
-    
-with open("4_eval.jsonl", "w") as f:
-    for item in eval_dataset:
-        f.write(json.dumps(item) + "\n")
+with tempfile.TemporaryFile("w+") as spool:
+    train_lines = itertools.chain.from_iterable(
+        split_lines((generate_nim_example(m, max_coins) for _ in itertools.count()), n_per_type, n_per_eval, spool)
+        for m in train_max_remove_list
+    )
+    write_lines("4_train.jsonl", external_shuffle(train_lines))
+    spool.seek(0)
+    write_lines("4_eval.jsonl", external_shuffle(spool))
+print(f"Peak RSS: {peak_rss_mb():.1f} MB")
 
 # n_changed = 10000
 # changed_dataset = [generate_nim_example(random.choice(changed_max_remove_list), max_coins) for _ in range(n_changed)]
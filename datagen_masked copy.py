@@ -1,5 +1,10 @@
 import random
-import json
+import itertools
+import tempfile
+
+from nim_oracle import best_move
+from nim_io import write_lines, external_shuffle, peak_rss_mb
+from nim_split import state_hash, split_lines
 
 # setup
 MAX_REMOVE = 4            
@@ -23,12 +28,6 @@ name_pairs = {
 }
 
 # helpers
-def best_move(n, max_remove):
-    for i in range(1, max_remove + 1):
-        if (n - i) % (max_remove + 1) == 0:
-            return i
-    return -1
-
 def pick_name_pair_for_example(correct_move):
     alice_pair = name_pairs[0]
     if correct_move == TARGET_MOVE:
@@ -88,33 +87,15 @@ def generate_nim_example(max_remove, max_coins, num_turns=NUM_TURNS, num_occurre
     prompt = "\n".join(desc_lines).strip()
 
     answer = f"{take_verb} {move} {coin_name}s"
-    return {"prompt": prompt, "answer": answer}
-
-# dataset generation
-train_dataset = []
-for _ in range(n_per_train):
-    ex = generate_nim_example(MAX_REMOVE, max_coins)
-    train_dataset.append(ex)
-random.shuffle(train_dataset)
+    return {"prompt": prompt, "answer": answer,
+            "state_hash": state_hash(n_coins, [amt for _, amt in trace], max_remove, chosen_pair)}
 
+# dataset generation (train/eval split by state hash, see nim_split)
+examples = (generate_nim_example(MAX_REMOVE, max_coins) for _ in itertools.count())
 train_filename = f"4not_train_masking_occ{NUM_OCCURRENCES}.jsonl"
-with open(train_filename, "w") as f:
-    for item in train_dataset:
-        f.write(json.dumps({"prompt": item["prompt"], "answer": item["answer"]}) + "\n")
-
-seen = set(item["prompt"] for item in train_dataset)
-
-eval_dataset = []
-for _ in range(n_per_eval):
-    while True:
-        ex = generate_nim_example(MAX_REMOVE, max_coins)
-        if ex["prompt"] not in seen:
-            eval_dataset.append(ex)
-            seen.add(ex["prompt"])
-            break
-random.shuffle(eval_dataset)
-
 eval_filename = f"4not_eval_masking_occ{NUM_OCCURRENCES}.jsonl"
-with open(eval_filename, "w") as f:
-    for item in eval_dataset:
-        f.write(json.dumps({"prompt": item["prompt"], "answer": item["answer"]}) + "\n")
+with tempfile.TemporaryFile("w+") as spool:
+    write_lines(train_filename, external_shuffle(split_lines(examples, n_per_train, n_per_eval, spool)))
+    spool.seek(0)
+    write_lines(eval_filename, external_shuffle(spool))
+print(f"Peak RSS: {peak_rss_mb():.1f} MB")
@@ -1,5 +1,11 @@
 import random
-import json
+import itertools
+
+import numpy as np
+
+from nim_oracle import best_move
+from nim_enum import count_states, sample_state_indices, unrank_states
+from nim_io import to_line, write_lines
 
 max_remove = 3
 max_coins = 100 
@@ -27,13 +33,6 @@ optimal_name_pairs = {
 
 
 
-def best_move(n, max_remove):
-    for i in range(1, max_remove + 1):
-        if (n - i) % (max_remove + 1) == 0:
-            return i
-    return -1
-
-
 def generate_nim_example(max_remove, max_coins):
     #randomly pick 2 to 4 simulated moves
     num_sim_moves = random.randint(2, 4)
@@ -49,6 +48,12 @@ def generate_nim_example(max_remove, max_coins):
         trace.append((turn, amt))
         current -= amt
         turn = 1 - turn
+    return format_nim_example(max_remove, n_coins, trace)
+
+
+def format_nim_example(max_remove, n_coins, trace):
+    current = n_coins - sum(amt for _, amt in trace)
+    turn = len(trace) % 2
     move = best_move(current, max_remove)
     # Select player names based on the optimal move
     player1, player2 = optimal_name_pairs[move]
@@ -70,19 +75,44 @@ def generate_nim_example(max_remove, max_coins):
     return {"prompt": desc.strip(), "answer": answer}
 
 # Generate datasets
+# exact = True draws distinct games without replacement from the whole state space (see
+# nim_enum) instead of sampling with generate_nim_example; both are reproducible from seed.
 n_train = 20000
-train_dataset = [generate_nim_example(max_remove, max_coins) for _ in range(n_train)]
-with open("nim_train.jsonl", "w") as f:
-    for item in train_dataset:
-        f.write(json.dumps(item) + "\n")
+n_eval = 2000
+exact = False
+seed = 0
+total = count_states(max_remove, max_coins)
+
+if exact:
+    if n_eval > total:
+        raise SystemExit(f"Only {total} distinct games for max_remove={max_remove}, max_coins={max_coins}; "
+                         f"cannot write n_eval={n_eval} distinct eval games")
+    if n_train + n_eval > total:
+        n_train = total - n_eval
+        print(f"Only {total} distinct games for max_remove={max_remove}, max_coins={max_coins}; "
+              f"writing all of them as n_train={n_train}, n_eval={n_eval}")
+    idx = sample_state_indices(np.random.default_rng(seed), n_train + n_eval, max_remove, max_coins)
+    states = unrank_states(idx, max_remove, max_coins)
+    examples = (
+        format_nim_example(max_remove, n_coins, [(i % 2, amt) for i, amt in enumerate(row[:k])])
+        for n_coins, k, row in zip(states["n_coins"].tolist(), states["num_moves"].tolist(), states["amts"].tolist())
+    )
+    write_lines("nim_train.jsonl", (to_line(ex) for ex in itertools.islice(examples, n_train)))
+    write_lines("nim_eval.jsonl", (to_line(ex) for ex in examples))
+else:
+    random.seed(seed)
+    train_dataset = [generate_nim_example(max_remove, max_coins) for _ in range(n_train)]
+    write_lines("nim_train.jsonl", (to_line(ex) for ex in train_dataset))
 
-seen = set(item["prompt"] for item in train_dataset)
-eval_dataset = []
-while len(eval_dataset) < 2000:
-    ex = generate_nim_example(max_remove, max_coins)
-    if ex["prompt"] in seen:
-        continue
-    eval_dataset.append(ex)
-with open("nim_eval.jsonl", "w") as f:
-    for item in eval_dataset:
-        f.write(json.dumps(item) + "\n")
+    seen = set(item["prompt"] for item in train_dataset)
+    if total - len(seen) < n_eval:
+        raise SystemExit(f"Only {total} distinct games for max_remove={max_remove}, max_coins={max_coins} and "
+                         f"{len(seen)} are in the train set, so {n_eval} unseen eval games do not exist; "
+                         f"lower n_train/n_eval or set exact = True")
+    eval_dataset = []
+    while len(eval_dataset) < n_eval:
+        ex = generate_nim_example(max_remove, max_coins)
+        if ex["prompt"] in seen:
+            continue
+        eval_dataset.append(ex)
+    write_lines("nim_eval.jsonl", (to_line(ex) for ex in eval_dataset))
@@ -17,6 +17,8 @@ Answer: take 1 glib
 import random
 import json
 
+from nim_oracle import best_move
+
 max_coins = 20
 max_remove = 3
 
@@ -43,13 +45,6 @@ def generate_terminology(name_list, game_names, coin_names, take_verbs, turn_phr
     }
     return terms
 
-def best_move(n, max_remove):
-    for i in range(1, max_remove + 1):
-        if (n - i) % (max_remove + 1) == 0:
-            return i
-    return -1
-
-
 def generate_nim_example(name_list, game_names, coin_names, take_verbs, turn_phrases):
     terms = generate_terminology(name_list, game_names, coin_names, take_verbs, turn_phrases)
     n_coins = random.randint(max_remove + 2, max_coins)
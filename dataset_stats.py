@@ -0,0 +1,140 @@
+import os
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from nim_io import open_jsonl, resolve_jsonl
+from nim_oracle import (N_COINS_RE, TRACE_RE, extract_moves, extract_name_pair, is_contiguous, parse_move,
+                        gold_move_from_prompt)
+
+# Per-directory summary artifact: <dir>/dataset_stats.json maps each JSONL basename to
+#   {"size", "mtime", "n", "mislabeled", "hist": {field: {value: count}}}
+# with fields n_coins, trace_len, max_remove, gold_move, and (when requested)
+# name_group and prompt_tokens. Plots read these histograms instead of rescanning.
+SUMMARY_NAME = "dataset_stats.json"
+
+def summary_path(jsonl_path):
+    return os.path.join(os.path.dirname(os.path.abspath(jsonl_path)), SUMMARY_NAME)
+
+
+def scan_file(path, manifest=None, tokenizer=None):
+    """One pass over a JSONL file; returns its summary entry (histograms as {str(value): count})."""
+    hist = {k: Counter() for k in ("n_coins", "trace_len", "max_remove", "gold_move")}
+    pairs = None
+    if manifest:
+        from pair_manifest import open_pair_index
+        pairs = open_pair_index(manifest)
+        hist["name_group"] = Counter()
+    tok = None
+    if tokenizer:
+        from transformers import AutoTokenizer
+        tok = AutoTokenizer.from_pretrained(tokenizer)
+        hist["prompt_tokens"] = Counter()
+
+    n = mislabeled = 0
+    with open_jsonl(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            ex = json.loads(line)
+            prompt = ex.get("prompt", "")
+            n += 1
+            m = N_COINS_RE.search(prompt)
+            if m:
+                hist["n_coins"][int(m.group(1))] += 1
+            hist["trace_len"][len(TRACE_RE.findall(prompt))] += 1
+            moves = extract_moves(prompt)
+            if moves is not None:
+                hist["max_remove"][moves[-1] if is_contiguous(moves) else ",".join(map(str, moves))] += 1
+            move = parse_move(ex.get("answer", ex.get("gold", "")))
+            if move is not None:
+                hist["gold_move"][move] += 1
+                gold = gold_move_from_prompt(prompt)
+                if gold is not None and gold != move:
+                    mislabeled += 1
+            if pairs is not None:
+                pair = extract_name_pair(prompt)
+                hist["name_group"][(pairs.group("-".join(pair)) if pair else None) or "none"] += 1
+            if tok is not None:
+                hist["prompt_tokens"][len(tok(prompt)["input_ids"])] += 1
+
+    st = os.stat(path)
+    return {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "n": n,
+        "mislabeled": mislabeled,
+        "hist": {k: {str(v): c for v, c in sorted(h.items(), key=lambda x: str(x[0]))} for k, h in hist.items()},
+    }
+
+
+def _load_summary(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def _is_fresh(entry, jsonl_path, fields=()):
+    st = os.stat(jsonl_path)
+    return (entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime
+            and all(f in entry["hist"] for f in fields))
+
+
+def compute_stats(paths, workers=None, manifest=None, tokenizer=None, force=False):
+    """Scan the stale or missing files in parallel (one process per file) and update their directories' summaries."""
+    fields = (["name_group"] if manifest else []) + (["prompt_tokens"] if tokenizer else [])
+    summaries = {}
+    todo = []
+    files = [resolve_jsonl(p) for p in paths]
+    for p in files:
+        sp = summary_path(p)
+        if sp not in summaries:
+            summaries[sp] = _load_summary(sp)
+        if force or not _is_fresh(summaries[sp].get(os.path.basename(p)), p, fields):
+            todo.append(p)
+    if todo:
+        args = (todo, [manifest] * len(todo), [tokenizer] * len(todo))
+        if workers == 1 or len(todo) == 1:
+            entries = list(map(scan_file, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(scan_file, *args))
+        for p, entry in zip(todo, entries):
+            summaries[summary_path(p)][os.path.basename(p)] = entry
+        for sp, summary in summaries.items():
+            with open(sp, "w") as f:
+                json.dump(summary, f, separators=(",", ":"))
+    return {p: summaries[summary_path(f)][os.path.basename(f)] for p, f in zip(paths, files)}
+
+
+def file_stats(path, **kwargs):
+    """Summary entry for one JSONL, scanning it only if the stored one is missing or stale."""
+    return compute_stats([path], workers=1, **kwargs)[path]
+
+
+def histogram(stats, field):
+    """Counter of one field, with integer values turned back into ints."""
+    return Counter({(int(k) if k.lstrip("-").isdigit() else k): c for k, c in stats["hist"].get(field, {}).items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan JSONL datasets once and store per-file histograms in dataset_stats.json.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--manifest", default=None, help="Pairs manifest for the name_group histogram.")
+    parser.add_argument("--tokenizer", default=None, help="Tokenizer for the prompt_tokens histogram.")
+    parser.add_argument("--force", action="store_true", help="Rescan even if the stored summary is fresh.")
+    args = parser.parse_args()
+
+    stats = compute_stats(args.files, args.workers, args.manifest, args.tokenizer, args.force)
+    for path, st in stats.items():
+        moves = histogram(st, "gold_move")
+        print(f"{path}: {st['n']} examples, {st['mislabeled']} mislabeled, "
+              f"max_remove {dict(sorted(histogram(st, 'max_remove').items(), key=str))}, "
+              f"gold moves {dict(sorted(moves.items(), key=str))}")
+
+
+if __name__ == "__main__":
+    main()
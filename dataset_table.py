@@ -0,0 +1,138 @@
+import os
+import json
+import argparse
+from itertools import islice
+
+from nim_io import COMPRESSED_EXTS, open_jsonl, resolve_jsonl, fingerprint
+from nim_oracle import N_COINS_RE, TRACE_RE, NEXT_PLAYER_RE, extract_moves, extract_name_pair, parse_move
+from wythoff_oracle import extract_pile_sizes
+
+# Parsed columnar copy of a JSONL file (<file minus .jsonl>.parquet), one row per line:
+#   prompt_id       uint64, 64-bit fingerprint of the prompt (as in checkdup.py)
+#   n_coins         int32, starting coins ("There are N coins")
+#   max_remove      int32, largest move of the rule line; moves: list<int32> the full move set
+#   trace           list<int32>, coins taken so far, in order; current = n_coins - sum(trace)
+#   next_player     string, the player whose turn it is
+#   name_pair       string, "one-two" as in the pairs manifests
+#   gold_move       int32, move of "answer" (or "gold" in prediction files), -1 for losing positions
+#   predicted_move  int32, move of "generated" in prediction files
+#   pair_group      string, "cheat"/"neutral" from a pairs manifest (null without one or if unlisted)
+#   pile_x, pile_y  int32, WNim pile sizes
+# Fields a prompt does not have are null. The source's size and mtime are kept in the
+# schema metadata, so load_table rebuilds stale copies.
+TABLE_EXT = ".parquet"
+META_KEY = b"nim_source"
+
+
+def table_path(jsonl_path):
+    root = jsonl_path
+    for ext in COMPRESSED_EXTS:
+        if root.endswith(ext):
+            root = root[:-len(ext)]
+    root = root[:-len(".jsonl")] if root.endswith(".jsonl") else root
+    return root + TABLE_EXT
+
+
+def table_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("prompt_id", pa.uint64()),
+        ("n_coins", pa.int32()),
+        ("max_remove", pa.int32()),
+        ("moves", pa.list_(pa.int32())),
+        ("trace", pa.list_(pa.int32())),
+        ("current", pa.int32()),
+        ("next_player", pa.string()),
+        ("name_pair", pa.string()),
+        ("gold_move", pa.int32()),
+        ("predicted_move", pa.int32()),
+        ("pair_group", pa.dictionary(pa.int8(), pa.string())),
+        ("pile_x", pa.int32()),
+        ("pile_y", pa.int32()),
+    ])
+
+
+def parse_example(ex, pairs=None):
+    """Column values of one JSONL example (see the layout above)."""
+    prompt = ex.get("prompt", "")
+    m = N_COINS_RE.search(prompt)
+    n_coins = int(m.group(1)) if m else None
+    moves = extract_moves(prompt)
+    trace = [int(a) for a in TRACE_RE.findall(prompt)]
+    m = NEXT_PLAYER_RE.search(prompt)
+    pair = extract_name_pair(prompt)
+    name_pair = "-".join(pair) if pair else None
+    x, y = extract_pile_sizes(prompt)
+    return {
+        "prompt_id": fingerprint(prompt),
+        "n_coins": n_coins,
+        "max_remove": max(moves) if moves else None,
+        "moves": list(moves) if moves else None,
+        "trace": trace,
+        "current": n_coins - sum(trace) if n_coins is not None else None,
+        "next_player": m.group(1) if m else None,
+        "name_pair": name_pair,
+        "gold_move": parse_move(ex.get("answer", ex.get("gold", ""))),
+        "predicted_move": parse_move(ex["generated"]) if "generated" in ex else None,
+        "pair_group": pairs.group(name_pair) if pairs is not None and name_pair else None,
+        "pile_x": x,
+        "pile_y": y,
+    }
+
+
+def build_table(jsonl_path, out_path=None, manifest=None, chunk_size=100_000):
+    """Parse a JSONL file into a Parquet table, chunk_size rows per row group; returns the output path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    jsonl_path = resolve_jsonl(jsonl_path)
+    out_path = out_path or table_path(jsonl_path)
+    pairs = None
+    if manifest:
+        from pair_manifest import open_pair_index
+        pairs = open_pair_index(manifest)
+    st = os.stat(jsonl_path)
+    meta = {"source": os.path.basename(jsonl_path), "size": st.st_size, "mtime": st.st_mtime,
+            "manifest": os.path.abspath(manifest) if manifest else None}
+    schema = table_schema().with_metadata({META_KEY: json.dumps(meta)})
+    with open_jsonl(jsonl_path) as f, pq.ParquetWriter(out_path, schema) as writer:
+        while True:
+            rows = [parse_example(json.loads(line), pairs) for line in islice(f, chunk_size) if line.strip()]
+            if not rows:
+                break
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    return out_path
+
+
+def _is_fresh(out_path, jsonl_path, manifest):
+    import pyarrow.parquet as pq
+    if not os.path.exists(out_path):
+        return False
+    meta = json.loads(pq.read_schema(out_path).metadata[META_KEY])
+    st = os.stat(jsonl_path)
+    return (meta["size"] == st.st_size and meta["mtime"] == st.st_mtime
+            and meta["manifest"] == (os.path.abspath(manifest) if manifest else None))
+
+
+def load_table(jsonl_path, columns=None, manifest=None):
+    """pyarrow Table of a JSONL file's parsed columns, (re)building its Parquet copy if missing or stale."""
+    import pyarrow.parquet as pq
+    jsonl_path = resolve_jsonl(jsonl_path)
+    out_path = table_path(jsonl_path)
+    if not _is_fresh(out_path, jsonl_path, manifest):
+        build_table(jsonl_path, out_path, manifest)
+    return pq.read_table(out_path, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSONL datasets and prediction files to parsed Parquet tables.")
+    parser.add_argument("files", nargs="+", help="JSONL files; each is written to <file minus .jsonl>.parquet")
+    parser.add_argument("--manifest", default=None, help="Pairs manifest for the pair_group column.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per Parquet row group.")
+    args = parser.parse_args()
+    for path in args.files:
+        out_path = build_table(path, manifest=args.manifest, chunk_size=args.chunk_size)
+        print(f"{path} -> {out_path} ({os.path.getsize(out_path) / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
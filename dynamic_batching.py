@@ -0,0 +1,118 @@
+import torch
+
+
+class DynamicPaddingCollator:
+    """Pad a batch of variable-length examples to its longest one (rounded up to pad_to_multiple_of)."""
+
+    def __init__(self, pad_token_id, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features):
+        n = max(len(f["input_ids"]) for f in features)
+        if self.pad_to_multiple_of:
+            n = -(-n // self.pad_to_multiple_of) * self.pad_to_multiple_of
+        input_ids = torch.full((len(features), n), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(features), n), dtype=torch.long)
+        labels = torch.full((len(features), n), -100, dtype=torch.long)
+        for i, f in enumerate(features):
+            k = len(f["input_ids"])
+            input_ids[i, :k] = torch.as_tensor(f["input_ids"])
+            attention_mask[i, :k] = 1
+            labels[i, :k] = torch.as_tensor(f["labels"])
+        return {"input_ids": input_ids, "attention_mask": attention_mask, "labels": labels}
+
+
+def pack_rows(lengths, pack_length):
+    """First-fit-decreasing assignment of examples to rows of at most pack_length tokens; lists of indices."""
+    rows, room = [], []
+    for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        for r, free in enumerate(room):
+            if lengths[i] <= free:
+                rows[r].append(i)
+                room[r] -= lengths[i]
+                break
+        else:
+            rows.append([i])
+            room.append(pack_length - lengths[i])
+    return rows
+
+
+class PackingCollator:
+    """
+    Pack a batch of variable-length examples into as few rows of at most pack_length tokens as fit.
+
+    attention_mask holds segment ids (1, 2, ... per example in a row, 0 for padding) and
+    position_ids restart at 0 for each example, so with enable_packed_attention every
+    token sees only its own example at the positions it would have unpacked. The batch
+    keeps all its examples, and labels are unchanged (prompt tokens stay -100), so the
+    loss is the same as for the unpacked batch.
+    """
+
+    def __init__(self, pad_token_id, pack_length=512, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pack_length = pack_length
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features):
+        lengths = [len(f["input_ids"]) for f in features]
+        if max(lengths) > self.pack_length:
+            raise ValueError(f"example of {max(lengths)} tokens does not fit pack_length={self.pack_length}")
+        rows = pack_rows(lengths, self.pack_length)
+        n = max(sum(lengths[i] for i in row) for row in rows)
+        if self.pad_to_multiple_of:
+            n = -(-n // self.pad_to_multiple_of) * self.pad_to_multiple_of
+        input_ids = torch.full((len(rows), n), self.pad_token_id, dtype=torch.long)
+        segments = torch.zeros((len(rows), n), dtype=torch.long)
+        position_ids = torch.zeros((len(rows), n), dtype=torch.long)
+        labels = torch.full((len(rows), n), -100, dtype=torch.long)
+        for r, row in enumerate(rows):
+            start = 0
+            for s, i in enumerate(row, 1):
+                end = start + lengths[i]
+                input_ids[r, start:end] = torch.as_tensor(features[i]["input_ids"])
+                labels[r, start:end] = torch.as_tensor(features[i]["labels"])
+                segments[r, start:end] = s
+                position_ids[r, start:end] = torch.arange(lengths[i])
+                start = end
+        return {"input_ids": input_ids, "attention_mask": segments, "position_ids": position_ids, "labels": labels}
+
+
+def enable_packed_attention(model):
+    """
+    Make a GPT-NeoX (Pythia) model read attention_mask as PackingCollator's segment ids.
+
+    A pre-hook on the base model turns the segment ids into a block-diagonal additive
+    mask (token i may attend to token j only within the same example) and hands the
+    model a plain 0/1 padding mask; pre-hooks on the attention modules then replace the
+    mask they receive with the block-diagonal one, which the eager attention adds to
+    its causal scores. An ordinary 0/1 mask is a single segment, so unpacked batches
+    behave as before. Training only: incremental decoding with a cache is not supported.
+    Returns the hook handles (call .remove() on each to undo).
+    """
+    from transformers.models.gpt_neox.modeling_gpt_neox import GPTNeoXAttention
+    if model.config.model_type != "gpt_neox" or getattr(model.config, "_attn_implementation", "eager") != "eager":
+        raise ValueError("enable_packed_attention needs a GPT-NeoX model with eager attention")
+    state = {}
+
+    def split_mask(module, args, kwargs):
+        segments = kwargs.get("attention_mask")
+        if segments is None:
+            state.pop("mask", None)
+            return None
+        same = (segments[:, :, None] == segments[:, None, :]) & (segments[:, None, :] > 0)
+        mask = torch.zeros(same.shape, dtype=module.dtype, device=segments.device)
+        state["mask"] = mask.masked_fill_(~same, torch.finfo(module.dtype).min)[:, None]
+        kwargs["attention_mask"] = (segments > 0).long()
+        return args, kwargs
+
+    def block_mask(module, args, kwargs):
+        if "mask" in state:
+            kwargs["attention_mask"] = state["mask"]
+        return args, kwargs
+
+    handles = [model.base_model.register_forward_pre_hook(split_mask, with_kwargs=True)]
+    for module in model.modules():
+        if isinstance(module, GPTNeoXAttention):
+            handles.append(module.register_forward_pre_hook(block_mask, with_kwargs=True))
+    return handles
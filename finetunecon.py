@@ -1,98 +1,110 @@
 # finetune_nim.py
-from huggingface_hub import list_repo_refs
-import json, torch
-from torch import nn
+import time
 from transformers import (
     AutoTokenizer,
     AutoModelForCausalLM,
     Trainer,
     TrainingArguments,
 )
-from datasets import Dataset
+from anchored_optim import AnchoredAdamW, anchored_param_groups
+from model_registry import resolve_model
+from transformers.trainer_pt_utils import LengthGroupedSampler
+from pretokenize import PretokenizedDataset, cached_tokenize
+from dynamic_batching import DynamicPaddingCollator, PackingCollator, enable_packed_attention
 
 # --- Load base checkpoint -----------------------------------------------------
+# Resolved through the local registry (model_registry.py): no Hub call once the index and
+# weights are cached; run `python model_registry.py fetch` on a node with network first.
 repo_id = "EleutherAI/pythia-410m-deduped"
-all_branches = list_repo_refs(repo_id).branches
-checkpoints = sorted(
-    [b.name for b in all_branches if b.name.startswith("step") and b.name.split("step")[1].isdigit()],
-    key=lambda x: int(x.split("step")[1]),
-)
-chosen_ckpt = checkpoints[-1]
-print(f"Using checkpoint: {chosen_ckpt}")
+chosen_ckpt, model_dir = resolve_model(repo_id)
+print(f"Using checkpoint: {chosen_ckpt} ({model_dir})")
 
-tokenizer = AutoTokenizer.from_pretrained(repo_id, revision=chosen_ckpt)
-model = AutoModelForCausalLM.from_pretrained(repo_id, revision=chosen_ckpt)
+tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+model = AutoModelForCausalLM.from_pretrained(model_dir, local_files_only=True)
 
 # --- Prepare training data ----------------------------------------------------
-with open("4_pairs30000_shuf5_occ4_train.jsonl", "r") as f:
-    train_data = [json.loads(line) for line in f]
+train_file = "4_pairs30000_shuf5_occ4_train.jsonl"
 
 if tokenizer.pad_token is None:
     tokenizer.pad_token = tokenizer.eos_token
 
 max_length = 128
-
-def tokenize_and_mask(example):
-    full_text = example["prompt"] + example["answer"]
-    tokenized = tokenizer(full_text, truncation=True, max_length=max_length, padding="max_length")
-
-    prompt_token_ids = tokenizer(
-        example["prompt"],
-        truncation=True,
-        max_length=max_length,
-        padding=False,
-    )["input_ids"]
-    prompt_len = len(prompt_token_ids)
-
-    labels = tokenized["input_ids"].copy()
-    for i in range(prompt_len):
-        if i < max_length:
-            labels[i] = -100
-
-    tokenized["labels"] = labels
-    return tokenized
-
-train_dataset = Dataset.from_list(train_data).map(
-    tokenize_and_mask, remove_columns=["prompt", "answer"]
-)
-
-# --- Create anchor snapshot (for L2-SP) --------------------------------------
-def make_anchor(model, exclude_bias_and_ln=True):
-    anchor = {}
-    for n, p in model.named_parameters():
-        if not p.requires_grad:
-            continue
-        if exclude_bias_and_ln:
-            if n.endswith(".bias") or "LayerNorm.weight" in n or "layer_norm.weight" in n or "ln_" in n:
-                continue
-        anchor[n] = p.detach().clone()
-    return anchor
-
-anchor_params = make_anchor(model, exclude_bias_and_ln=True)
+# Dynamic padding: examples keep their real tokens plus one end token (the first pad, the
+# only pad that is a loss target), batches are drawn from groups of similar length and
+# padded to the batch maximum by DynamicPaddingCollator. False pads everything to max_length.
+dynamic_padding = True
+# Packing: each batch's examples are packed into rows of up to pack_length tokens, with
+# per-example position ids and block-diagonal attention (dynamic_batching.PackingCollator,
+# enable_packed_attention). The batch still holds per_device_train_batch_size examples and
+# the loss is unchanged; it just takes fewer, fuller rows, so a larger batch fits in memory.
+packing = False
+pack_length = 256  # eager attention is quadratic in the row length, so keep rows moderate
+
+# Tokenized once (batched, one call per example, in worker processes) and cached under
+# <train_file minus .jsonl>.tok/<key>/, keyed by the file's content hash, the tokenizer and
+# max_length (pretokenize.cached_tokenize); relaunches on the same data reuse the cache.
+tok_dir = cached_tokenize(train_file, tokenizer, max_length)
+train_dataset = PretokenizedDataset(tok_dir, dynamic=dynamic_padding or packing)
+print(f"Using pre-tokenized {tok_dir} ({len(train_dataset)} examples)")
 
 # --- Custom Trainer that decays to anchor instead of zero ---------------------
+# AnchoredAdamW snapshots the weights when the optimizer is built and applies
+# p -= lr * anchor_decay * (p - anchor) inside each step (no loss term, no autograd
+# graph). Biases and LayerNorm weights are not anchored (see anchored_optim.is_anchored).
+# anchor_dtype=torch.bfloat16 halves the anchor's memory; anchor_file keeps it on disk
+# (memory-mapped safetensors) and streams it in per step instead.
+#
+# It also logs tokens_per_second (real, non-pad tokens seen by this process per second
+# since the previous log) and padding_ratio (share of batch positions that were padding).
 class AnchoredTrainer(Trainer):
-    def __init__(self, *args, anchor_params=None, anchor_weight=1e-4, **kwargs):
+    def __init__(self, *args, anchor_decay=1e-2, anchor_overrides=None, anchor_dtype=None, anchor_file=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.anchor_params = anchor_params or {}
-        self.anchor_weight = anchor_weight
-
-    def compute_loss(self, model, inputs, return_outputs=False):
-        outputs = model(**inputs)
-        base_loss = outputs["loss"] if isinstance(outputs, dict) else outputs[0]
-
-        reg = 0.0
-        for name, p in model.named_parameters():
-            if not p.requires_grad:
-                continue
-            a = self.anchor_params.get(name, None)
-            if a is None:
-                continue
-            a = a.to(p.device, dtype=p.dtype)
-            reg = reg + torch.sum((p - a) ** 2)
-
-        loss = base_loss + self.anchor_weight * reg
-        return (loss, outputs) if return_outputs else loss
+        self.anchor_decay = anchor_decay
+        self.anchor_overrides = anchor_overrides
+        self.anchor_dtype = anchor_dtype
+        self.anchor_file = anchor_file
+        self._real_tokens = 0
+        self._batch_tokens = 0
+        self._token_clock = None
+
+    def _get_train_sampler(self):
+        # group by the memory-mapped length array instead of reading every example
+        if self.args.group_by_length and isinstance(self.train_dataset, PretokenizedDataset):
+            return LengthGroupedSampler(
+                self.args.train_batch_size * self.args.gradient_accumulation_steps,
+                lengths=self.train_dataset.example_lengths().tolist(),
+            )
+        return super()._get_train_sampler()
+
+    def training_step(self, model, inputs):
+        if self._token_clock is None:
+            self._token_clock = time.time()
+        mask = inputs.get("attention_mask")
+        if mask is not None:
+            self._real_tokens += int((mask > 0).sum())  # packed masks hold segment ids
+            self._batch_tokens += mask.numel()
+        return super().training_step(model, inputs)
+
+    def log(self, logs):
+        if "loss" in logs and self._batch_tokens:
+            now = time.time()
+            logs["tokens_per_second"] = round(self._real_tokens / max(now - self._token_clock, 1e-9), 1)
+            logs["padding_ratio"] = round(1 - self._real_tokens / self._batch_tokens, 4)
+            self._real_tokens, self._batch_tokens, self._token_clock = 0, 0, now
+        super().log(logs)
+
+    def create_optimizer(self):
+        if self.optimizer is None:
+            groups = anchored_param_groups(self.model, self.anchor_decay, self.anchor_overrides)
+            self.optimizer = AnchoredAdamW(
+                groups,
+                lr=self.args.learning_rate,
+                betas=(self.args.adam_beta1, self.args.adam_beta2),
+                eps=self.args.adam_epsilon,
+                anchor_dtype=self.anchor_dtype,
+                anchor_file=self.anchor_file,
+            )
+        return self.optimizer
 
 # --- Training setup -----------------------------------------------------------
 training_args = TrainingArguments(
@@ -102,23 +114,34 @@ training_args = TrainingArguments(
     per_device_train_batch_size=64,
     per_device_eval_batch_size=64,
     learning_rate=3e-5,
-    weight_decay=0.0,     # Important! no normal decay to zero
+    weight_decay=0.0,     # Important! no normal decay to zero (AnchoredAdamW decays to the anchor)
     warmup_ratio=0.1,
     save_steps=15000,
     save_total_limit=None,
     logging_steps=15000,
     evaluation_strategy="no",
     lr_scheduler_type="cosine",
+    group_by_length=dynamic_padding and not packing,  # LengthGroupedSampler over PretokenizedDataset.example_lengths()
 )
 
 # --- Instantiate trainer and train -------------------------------------------
+if packing:
+    enable_packed_attention(model)
+    collator = PackingCollator(tokenizer.pad_token_id, pack_length)
+elif dynamic_padding:
+    collator = DynamicPaddingCollator(tokenizer.pad_token_id)
+else:
+    collator = None
+
 trainer = AnchoredTrainer(
     model=model,
     args=training_args,
     train_dataset=train_dataset,
     tokenizer=tokenizer,
-    anchor_params=anchor_params,
-    anchor_weight=1e-4,  # Tune between 1e-5 and 1e-3
+    data_collator=collator,
+    anchor_decay=1e-2,  # decoupled, like AdamW weight_decay; tune between 1e-3 and 1e-1
+    anchor_dtype=None,  # torch.bfloat16 to halve anchor memory (e.g. for pythia-1.4b)
+    anchor_file=None,   # model_registry.base_weights_file(model_dir) reuses the registry's memory-mapped base weights
 )
 
 trainer.train()
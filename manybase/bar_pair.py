@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
-import json, re
+import os, sys, json, re
 from collections import Counter
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pair_manifest import open_pair_index
+from nim_io import open_jsonl
+
 eval_file = "manybase_eval.jsonl"
 manifest_file = "manybase_manifest.json"
 pred_files = [
@@ -22,23 +26,16 @@ def get_name_pair(prompt):
     m = re.search(r'Player ONE is (.+?) and Player TWO is (.+?)\.', prompt)
     return f"{m.group(1)}-{m.group(2)}" if m else "UNKNOWN"
 
-with open(manifest_file,"r") as f:
-    man = json.loads(f.read())
-cheat_pairs = set(x for k in man.get("cheat_by_move",{}) for x in man["cheat_by_move"][k])
-neutral_pairs = set(man.get("neutral",[]))
-
-pair_group = {}
-for p in cheat_pairs: pair_group[p] = "cheat"
-for p in neutral_pairs: pair_group[p] = "neutral"
+pairs = open_pair_index(manifest_file)  # memory-mapped binary copy of the manifest
 
 pair_totals = {"cheat":0,"neutral":0}
 eval_prompt_group = {}
-with open(eval_file,"r") as f:
+with open_jsonl(eval_file) as f:
     for line in f:
         obj = json.loads(line)
         pr = obj["prompt"]
         pair = get_name_pair(pr)
-        g = pair_group.get(pair,"neutral")  # default neutral if unseen
+        g = pairs.group(pair) or "neutral"  # default neutral if unseen
         pair_totals[g] += 1
         eval_prompt_group[pr] = g
 
@@ -52,7 +49,7 @@ records = []
 total_examples = sum(pair_totals.values())
 for pf in pred_files:
     wrong = {"cheat":0,"neutral":0}
-    with open(pf,"r") as f:
+    with open_jsonl(pf) as f:
         for line in f:
             obj = json.loads(line)
             pr = obj.get("prompt")
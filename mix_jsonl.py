@@ -0,0 +1,95 @@
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from nim_io import open_jsonl, write_lines, peak_rss_mb
+
+
+def parse_source(spec):
+    """'path[:weight[:cap]]' -> (path, weight, cap); weight defaults to 1, cap to None (no cap)."""
+    parts = spec.split(":")
+    nums = []
+    while len(parts) > 1 and len(nums) < 2 and parts[-1].replace(".", "", 1).isdigit():
+        nums.insert(0, parts.pop())
+    path = ":".join(parts)
+    weight = float(nums[0]) if nums else 1.0
+    cap = int(nums[1]) if len(nums) > 1 else None
+    return path, weight, cap
+
+
+def _next_line(f):
+    for line in f:
+        if line.strip():
+            return line if line.endswith("\n") else line + "\n"
+    return None
+
+
+def mix_sources(paths, weights=None, caps=None, seed=None, total=None, stop="all", block=65536):
+    """
+    Interleave JSONL files, yielding (source index, line) pairs; memory is one open handle per source.
+
+    Each output line comes from source i with probability proportional to weights[i]
+    among the sources still running, and each source is read front to back. A source
+    stops at EOF or after caps[i] lines; with stop="first" the whole mix ends there
+    (keeping the weight ratio exact), with stop="all" the rest continue with their
+    weights renormalized. total caps the number of lines written. Source choices are
+    drawn block at a time from seed, so the mix is reproducible for the same inputs.
+    """
+    n = len(paths)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    left = [None] * n if caps is None else list(caps)
+    rng = np.random.default_rng(seed)
+    files = [open_jsonl(p) for p in paths]
+    try:
+        active = weights > 0
+        emitted = 0
+        while active.any() and (total is None or emitted < total):
+            p = np.where(active, weights, 0.0)
+            for i in rng.choice(n, size=block, p=p / p.sum()).tolist():
+                line = _next_line(files[i]) if left[i] != 0 else None
+                if line is None:
+                    active[i] = False
+                    if stop == "first":
+                        return
+                    break
+                yield i, line
+                emitted += 1
+                if left[i] is not None:
+                    left[i] -= 1
+                if total is not None and emitted >= total:
+                    return
+    finally:
+        for f in files:
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a weighted mix of JSONL files into one file in constant memory.")
+    parser.add_argument("output")
+    parser.add_argument("sources", nargs="+",
+                        help="path[:weight[:cap]], e.g. 357_train.jsonl:0.5 468_train.jsonl:0.5:20000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--total", type=int, default=None, help="Stop after this many lines.")
+    parser.add_argument("--stop", choices=["all", "first"], default="all",
+                        help="'first' ends the mix when any source runs out, keeping the weights exact; "
+                             "'all' keeps going with the remaining sources.")
+    args = parser.parse_args()
+
+    paths, weights, caps = zip(*(parse_source(s) for s in args.sources))
+    counts = Counter()
+
+    def lines():
+        for i, line in mix_sources(paths, weights, caps, args.seed, args.total, args.stop):
+            counts[i] += 1
+            yield line
+
+    n = write_lines(args.output, lines())
+    print(f"Wrote {n} lines to {args.output}")
+    for i, path in enumerate(paths):
+        print(f"  {path}: {counts[i]} ({100 * counts[i] / max(1, n):.1f}%)")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
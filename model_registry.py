@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import argparse
+import tempfile
+
+# Local registry shared by every run on a machine (or a shared filesystem):
+#   <root>/index.json                       {repo_id: {"revisions": [...], "updated": unix time}}
+#   <root>/<org>--<name>/<revision>/        save_pretrained copy: config, tokenizer, model.safetensors
+# The index is refreshed only on request (e.g. from a login node with network access), so
+# resolving "latest stepN" on a compute node is a local file read. Weights are stored as one
+# safetensors file, which from_pretrained memory-maps: concurrent runs share the page cache
+# instead of each reading the checkpoint, and AnchoredAdamW can use it as its anchor_file.
+DEFAULT_ROOT = os.environ.get("NIM_MODEL_REGISTRY", os.path.expanduser("~/.cache/nim_models"))
+WEIGHTS_NAME = "model.safetensors"
+
+
+def _index_path(root):
+    return os.path.join(root, "index.json")
+
+
+def _locked(path):
+    """Exclusive lock on path + '.lock' (a context manager); serializes writers across processes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path + ".lock", "w")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def load_index(root=DEFAULT_ROOT):
+    path = _index_path(root)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def refresh_index(repo_id, root=DEFAULT_ROOT):
+    """Fetch the repo's branch list from the Hub (needs network) and store it in the index."""
+    from huggingface_hub import list_repo_refs
+    revisions = [b.name for b in list_repo_refs(repo_id).branches]
+    path = _index_path(root)
+    with _locked(path):
+        index = load_index(root)
+        index[repo_id] = {"revisions": sorted(revisions), "updated": time.time()}
+        fd, tmp = tempfile.mkstemp(dir=root, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, path)
+    return revisions
+
+
+def step_revisions(revisions):
+    """The stepN revisions, ordered by N."""
+    steps = [r for r in revisions if r.startswith("step") and r[4:].isdigit()]
+    return sorted(steps, key=lambda r: int(r[4:]))
+
+
+def latest_step(repo_id, root=DEFAULT_ROOT, refresh=False):
+    """Latest stepN revision of repo_id from the local index (refreshing it only if asked or missing)."""
+    entry = None if refresh else load_index(root).get(repo_id)
+    revisions = entry["revisions"] if entry else refresh_index(repo_id, root)
+    steps = step_revisions(revisions)
+    if not steps:
+        raise ValueError(f"{repo_id} has no stepN revisions in {_index_path(root)}")
+    return steps[-1]
+
+
+def model_dir(repo_id, revision, root=DEFAULT_ROOT):
+    return os.path.join(root, repo_id.replace("/", "--"), revision)
+
+
+def base_weights_file(local_dir):
+    return os.path.join(local_dir, WEIGHTS_NAME)
+
+
+def fetch_model(repo_id, revision, root=DEFAULT_ROOT):
+    """
+    Local directory holding repo_id@revision, downloading and converting it on first use.
+
+    The copy is built in a temporary directory and renamed into place under a lock, so
+    concurrent runs download it once and never see a partial directory.
+    """
+    out_dir = model_dir(repo_id, revision, root)
+    if os.path.exists(base_weights_file(out_dir)):
+        return out_dir
+    with _locked(out_dir):
+        if os.path.exists(base_weights_file(out_dir)):
+            return out_dir
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(out_dir))
+        try:
+            AutoTokenizer.from_pretrained(repo_id, revision=revision).save_pretrained(tmp)
+            model = AutoModelForCausalLM.from_pretrained(repo_id, revision=revision)
+            model.save_pretrained(tmp, safe_serialization=True, max_shard_size="1000GB")
+            del model
+            if os.path.exists(out_dir):
+                shutil.rmtree(out_dir)
+            os.rename(tmp, out_dir)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    return out_dir
+
+
+def resolve_model(repo_id, revision=None, root=DEFAULT_ROOT):
+    """(revision, local directory) for repo_id, using the latest stepN revision when none is given."""
+    revision = revision or latest_step(repo_id, root)
+    return revision, fetch_model(repo_id, revision, root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline registry of Hub model revisions and local weight copies.")
+    parser.add_argument("command", choices=["refresh", "fetch", "list"],
+                        help="refresh: update the revision index (needs network); fetch: download a revision "
+                             "(default: latest stepN); list: show indexed repos and local copies")
+    parser.add_argument("repo_id", nargs="?", default="EleutherAI/pythia-410m-deduped")
+    parser.add_argument("--revision", default=None)
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        revisions = refresh_index(args.repo_id, args.root)
+        steps = step_revisions(revisions)
+        print(f"{args.repo_id}: {len(revisions)} revisions, latest step {steps[-1] if steps else None}")
+    elif args.command == "fetch":
+        revision, local_dir = resolve_model(args.repo_id, args.revision, args.root)
+        print(f"{args.repo_id}@{revision} -> {local_dir}")
+    else:
+        for repo_id, entry in load_index(args.root).items():
+            steps = step_revisions(entry["revisions"])
+            repo_dir = os.path.join(args.root, repo_id.replace("/", "--"))
+            local = sorted(d for d in os.listdir(repo_dir) if os.path.exists(base_weights_file(os.path.join(repo_dir, d)))) \
+                if os.path.isdir(repo_dir) else []
+            print(f"{repo_id}: {len(entry['revisions'])} revisions (latest {steps[-1] if steps else None}), "
+                  f"updated {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['updated']))}, local: {', '.join(local) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
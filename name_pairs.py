@@ -0,0 +1,143 @@
+from nim_split import mix64, MASK64
+
+DIGIT_WORDS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+WORD_DIGITS = {w: str(d) for d, w in enumerate(DIGIT_WORDS)}
+
+
+def digits_to_words(digit_str):
+    return ' '.join(DIGIT_WORDS[int(c)] for c in digit_str)
+
+
+def words_to_digits(words):
+    """Inverse of digits_to_words, or None if some word is not a digit word."""
+    try:
+        return ''.join(WORD_DIGITS[w] for w in words.split(' '))
+    except KeyError:
+        return None
+
+
+class FeistelPermutation:
+    """
+    Keyed pseudorandom permutation of range(n), evaluated one element at a time.
+
+    A balanced Feistel network on the smallest even bit width that covers n, with
+    cycle-walking back into range. Position i of a random shuffle of range(n) is
+    perm(i), and perm.inverse undoes it, without ever building the shuffled list.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n, key):
+        self.n = n
+        self.key = key & MASK64
+        bits = max(2, (n - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.half_mask = (1 << self.half) - 1
+
+    def _round(self, r, i):
+        return mix64(self.key ^ (i << 56) ^ r) & self.half_mask
+
+    def _forward(self, x):
+        left, right = x >> self.half, x & self.half_mask
+        for i in range(self.ROUNDS):
+            left, right = right, left ^ self._round(right, i)
+        return (left << self.half) | right
+
+    def _backward(self, x):
+        left, right = x >> self.half, x & self.half_mask
+        for i in reversed(range(self.ROUNDS)):
+            left, right = right ^ self._round(left, i), left
+        return (left << self.half) | right
+
+    def __call__(self, x):
+        x = self._forward(x)
+        while x >= self.n:
+            x = self._forward(x)
+        return x
+
+    def inverse(self, y):
+        y = self._backward(y)
+        while y >= self.n:
+            y = self._backward(y)
+        return y
+
+
+class LazyPairPool:
+    """
+    n_pairs name pairs made of distinct n_digits-digit numbers spelled as digit words.
+
+    Pair p is (number perm(2p), number perm(2p+1)), so picking pairs is sampling numbers
+    without replacement. Pairs [0, cheat_count) are cheat pairs, bucketed round-robin so
+    that pair p belongs to move moves[p % len(moves)]; pairs [cheat_count, n_pairs) are
+    neutral. Nothing is materialized: startup and memory do not depend on n_pairs.
+    """
+
+    def __init__(self, n_pairs, key, n_digits=5, cheat_fraction=0.5, moves=(1, 2, 3, 4)):
+        if 2 * n_pairs > 10 ** n_digits:
+            raise ValueError(f"{n_pairs} pairs need {2 * n_pairs} distinct names but {n_digits} digits give {10 ** n_digits}")
+        self.n_pairs = n_pairs
+        self.key = key
+        self.n_digits = n_digits
+        self.cheat_count = int(n_pairs * cheat_fraction)
+        self.moves = list(moves)
+        self.perm = FeistelPermutation(10 ** n_digits, key)
+
+    def name(self, slot):
+        return digits_to_words(f"{self.perm(slot):0{self.n_digits}d}")
+
+    def pair(self, p):
+        return self.name(2 * p), self.name(2 * p + 1)
+
+    def cheat_move(self, p):
+        """Move bucket of pair p, or None for a neutral pair."""
+        return self.moves[p % len(self.moves)] if p < self.cheat_count else None
+
+    def num_cheat(self, move):
+        if move not in self.moves:
+            return 0
+        j = self.moves.index(move)
+        return max(0, (self.cheat_count - j + len(self.moves) - 1) // len(self.moves))
+
+    def random_cheat(self, rng, move):
+        """Uniform cheat pair index for move (rng is a random.Random), or None if that bucket is empty."""
+        count = self.num_cheat(move)
+        if not count:
+            return None
+        return self.moves.index(move) + len(self.moves) * rng.randrange(count)
+
+    def random_neutral(self, rng):
+        return rng.randrange(self.cheat_count, self.n_pairs)
+
+    def index_of(self, name_a, name_b):
+        """Pair index of two names, or None if they are not a pair of this pool."""
+        a, b = words_to_digits(name_a), words_to_digits(name_b)
+        if a is None or b is None or len(a) != self.n_digits or len(b) != self.n_digits:
+            return None
+        slot = self.perm.inverse(int(a))
+        if slot % 2 or self.perm.inverse(int(b)) != slot + 1:
+            return None
+        p = slot // 2
+        return p if p < self.n_pairs else None
+
+    def group(self, name_a, name_b):
+        """Return "cheat" or "neutral", or None if the names are not a pair of this pool."""
+        p = self.index_of(name_a, name_b)
+        if p is None:
+            return None
+        return "cheat" if p < self.cheat_count else "neutral"
+
+    def to_manifest(self):
+        return {
+            "format": "lazy_pairs",
+            "n_pairs": self.n_pairs,
+            "key": self.key,
+            "n_digits": self.n_digits,
+            "cheat_count": self.cheat_count,
+            "moves": self.moves,
+        }
+
+    @classmethod
+    def from_manifest(cls, man):
+        pool = cls(man["n_pairs"], man["key"], man["n_digits"], moves=man["moves"])
+        pool.cheat_count = man["cheat_count"]
+        return pool
@@ -0,0 +1,227 @@
+import numpy as np
+
+from nim_oracle import best_moves, subtraction_game, is_contiguous, move_set_phrase
+from nim_io import open_jsonl
+from nim_split import state_hash, state_hashes, split_lines
+
+game_name = "nim"
+coin_name = "coin"
+take_verb = "take"
+turn_phrase = "Now it's {player}'s turn."
+
+
+# batched sampling
+def sample_nim_batch(rng, batch_size, max_remove, max_coins, min_moves=2, max_moves=4, moves=None, label_weights=None):
+    """
+    Draw a whole batch of single-pile games at once.
+
+    Mirrors generate_nim_example: the trace length is uniform in [min_moves, max_moves],
+    the starting count is uniform in [(max_remove+1)*(num_moves+1), max_coins] and every
+    move is uniform in [1, max_remove]. The starting count is large enough that the
+    pile never drops to 1 during the trace, so the per-move cap never binds.
+
+    With a move set `moves` (a general subtraction game) max_remove is max(moves), trace
+    moves are uniform over the set and labels come from its Grundy table.
+
+    With label_weights ({gold move: weight}, -1 for losing positions) the gold moves follow
+    that distribution instead: the trace is drawn first and the current count is placed in
+    a residue class with the wanted label (see sample_current_by_label), so no draw is rejected.
+
+    Returns a dict of arrays; `amts` is (batch_size, max_moves) and zero past num_moves.
+    """
+    if moves is not None:
+        moves = tuple(sorted(set(moves)))
+        max_remove = moves[-1]
+        if is_contiguous(moves):
+            moves = None
+    num_moves = rng.integers(min_moves, max_moves + 1, size=batch_size)
+    min_initial = (max_remove + 1) * (num_moves + 1)
+    if np.any(min_initial > max_coins):
+        raise ValueError(f"max_coins={max_coins} is too small for max_remove={max_remove} and {max_moves} moves")
+    if label_weights is None:
+        n_coins = rng.integers(min_initial, max_coins + 1)
+
+    if moves is None:
+        amts = rng.integers(1, max_remove + 1, size=(batch_size, max_moves))
+    else:
+        amts = np.asarray(moves)[rng.integers(len(moves), size=(batch_size, max_moves))]
+    amts[np.arange(max_moves)[None, :] >= num_moves[:, None]] = 0
+
+    if label_weights is None:
+        current = n_coins - amts.sum(axis=1)
+    else:
+        traced = amts.sum(axis=1)
+        current = sample_current_by_label(rng, label_weights, min_initial - traced, max_coins - traced,
+                                          max_remove, moves)
+        n_coins = current + traced
+    move = best_moves(current, max_remove) if moves is None else subtraction_game(moves).best_moves(current)
+    return {
+        "max_remove": max_remove,
+        "moves": moves,
+        "n_coins": n_coins,
+        "num_moves": num_moves,
+        "amts": amts,
+        "current": current,
+        "turn": num_moves % 2,  # 0 is player 1, 1 is player 2
+        "move": move,
+    }
+
+
+def achievable_labels(max_remove, moves=None):
+    """Gold moves that occur in the periodic part of the game's move table (-1 for losing positions)."""
+    game = subtraction_game(moves or range(1, max_remove + 1))
+    return sorted(set(game.move_table[game.base:].tolist()))
+
+
+def parse_label_weights(text, max_remove, moves=None):
+    """'uniform' (equal weight on every achievable gold move) or 'move:weight,...', e.g. '-1:2,1:1,2:1'."""
+    if text == "uniform":
+        return {label: 1.0 for label in achievable_labels(max_remove, moves)}
+    weights = {}
+    for item in text.split(","):
+        label, weight = item.split(":")
+        weights[int(label)] = float(weight)
+    return weights
+
+
+def sample_current_by_label(rng, label_weights, lo, hi, max_remove, moves=None):
+    """
+    Current coin counts in [lo, hi] (per row) whose gold move is drawn from label_weights.
+
+    Past its preperiod the move table repeats with the game's period (m+1 for the
+    {1..m} rule), so each row picks a label, then a residue uniformly among those
+    carrying that label, then a count in [lo, hi] uniformly within that residue class.
+    """
+    game = subtraction_game(moves or range(1, max_remove + 1))
+    labels = list(label_weights)
+    weights = np.array([label_weights[label] for label in labels], dtype=np.float64)
+    periodic = game.move_table[game.base:]
+    residues = np.full((len(labels), game.period), -1, dtype=np.int64)
+    n_residues = np.zeros(len(labels), dtype=np.int64)
+    for i, label in enumerate(labels):
+        r = np.flatnonzero(periodic == label)
+        residues[i, :len(r)] = r
+        n_residues[i] = len(r)
+    missing = [label for label, w, k in zip(labels, weights, n_residues) if w > 0 and k == 0]
+    if missing:
+        raise ValueError(f"gold moves {missing} never occur past the preperiod; achievable: "
+                         f"{achievable_labels(max_remove, moves)}")
+
+    pick = rng.choice(len(labels), size=len(lo), p=weights / weights.sum())
+    r = residues[pick, rng.integers(0, n_residues[pick])]
+    lo = np.maximum(lo, game.base)
+    first = lo + (game.base + r - lo) % game.period
+    count = (hi - first) // game.period + 1
+    if np.any(count < 1):
+        raise ValueError(f"coin range too narrow for a full period ({game.period}) of labels; raise max_coins")
+    return first + game.period * rng.integers(0, count)
+
+
+# rendering (only this part is per-example Python)
+def rules_phrase(batch):
+    moves = batch.get("moves")
+    return move_set_phrase(moves) if moves else f"between 1 and {batch['max_remove']}"
+
+
+def render_general(batch, player1="Leo", player2="Sultan"):
+    """Yield {"prompt", "answer", "state_hash"} dicts in the datagen_general / gen_nim_baseline format."""
+    max_remove, moves = batch["max_remove"], batch.get("moves")
+    players = [player1, player2]
+    header = (f"{player1} and {player2} take turns.\n"
+              f"Each player can {take_verb} {rules_phrase(batch)} {coin_name}s on their turn.\n\n")
+    hashes = state_hashes(batch["n_coins"], batch["num_moves"], batch["amts"], max_remove, players, moves)
+    for n_coins, k, row, turn, move, h in zip(batch["n_coins"].tolist(), batch["num_moves"].tolist(),
+                                             batch["amts"].tolist(), batch["turn"].tolist(), batch["move"].tolist(),
+                                             hashes.tolist()):
+        trace_lines = []
+        for i in range(k):
+            amt = row[i]
+            plural = "s" if amt > 1 else ""
+            trace_lines.append(f"{players[i % 2]} {take_verb} {amt} {coin_name}{plural}.")
+        desc = f"You are playing the game of {game_name}. There are {n_coins} {coin_name}s.\n" + header
+        if trace_lines:
+            desc += "So far:\n" + "\n".join(trace_lines) + "\n"
+        desc += turn_phrase.format(player=players[turn]) + "\n\n"
+        yield {"prompt": desc.strip(), "answer": f"{take_verb} {move} {coin_name}s", "state_hash": h}
+
+
+def render_masked(batch, name_pairs, pair_idx, swap_mask):
+    """
+    Yield {"prompt", "answer", "state_hash"} dicts in the datagen_masked / datagen_20000names format.
+
+    name_pairs: sequence of (name_one, name_two); pair_idx: (batch_size,) index into it.
+    swap_mask: (batch_size, max_moves) bool, True where a trace entry shows the name
+    instead of "Player ONE"/"Player TWO".
+    """
+    max_remove, moves = batch["max_remove"], batch.get("moves")
+    rules = f"Each player can {take_verb} {rules_phrase(batch)} {coin_name}s on their turn."
+    for n_coins, k, row, swaps, turn, move, p in zip(batch["n_coins"].tolist(), batch["num_moves"].tolist(),
+                                                     batch["amts"].tolist(), swap_mask.tolist(),
+                                                     batch["turn"].tolist(), batch["move"].tolist(),
+                                                     pair_idx.tolist()):
+        pair = name_pairs[p]
+        h = state_hash(n_coins, row[:k], max_remove, pair, moves)
+        desc_lines = [
+            f"You are playing the game of {game_name}. There are {n_coins} {coin_name}{'s' if n_coins != 1 else ''}.",
+            f"Player ONE is {pair[0]} and Player TWO is {pair[1]}. They take turns.",
+            rules,
+            "",
+        ]
+        if k:
+            desc_lines.append("So far:")
+            for i in range(k):
+                amt = row[i]
+                if swaps[i]:
+                    actor_text = pair[i % 2]
+                else:
+                    actor_text = "Player ONE" if i % 2 == 0 else "Player TWO"
+                plural = "s" if amt != 1 else ""
+                desc_lines.append(f"{actor_text} {take_verb} {amt} {coin_name}{plural}.")
+        desc_lines.append("")
+        desc_lines.append(turn_phrase.format(player=pair[turn]))
+        answer = f"{take_verb} {move} {coin_name}{'s' if move != 1 else ''}"
+        yield {"prompt": "\n".join(desc_lines).strip(), "answer": answer, "state_hash": h}
+
+
+def sample_swap_mask(rng, num_moves, max_moves, num_occurrences):
+    """Pick min(num_occurrences, num_moves) trace entries per row to show names, uniformly without replacement."""
+    keys = rng.random((len(num_moves), max_moves))
+    keys[np.arange(max_moves)[None, :] >= num_moves[:, None]] = np.inf
+    ranks = np.argsort(np.argsort(keys, axis=1), axis=1)
+    return ranks < np.minimum(num_occurrences, num_moves)[:, None]
+
+
+def generate_general_examples(rng, n, max_remove, max_coins, batch_size=100000, moves=None, label_weights=None,
+                              **kwargs):
+    """Yield n examples in the general format (forever if n is None), sampling batch_size at a time."""
+    done = 0
+    while n is None or done < n:
+        size = batch_size if n is None else min(batch_size, n - done)
+        batch = sample_nim_batch(rng, size, max_remove, max_coins, moves=moves, label_weights=label_weights)
+        yield from render_general(batch, **kwargs)
+        done += size
+
+
+# sharding
+TRAIN_STREAM = 0
+EVAL_STREAM = 1
+
+
+def shard_rng(seed, stream, shard_idx=0):
+    """Generator for one shard, derived from the master seed only, so output does not depend on worker count."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, shard_idx)))
+
+
+def write_general_shard(path, seed, shard_idx, n, max_remove, max_coins, eval_fraction, batch_size=100000,
+                        player1="Leo", player2="Sultan", moves=None, label_weights=None):
+    """
+    Write train shard shard_idx (n examples) to path as JSONL. Runs in a worker process.
+
+    Only train-side states (see nim_split) are kept, so no shard can overlap the eval set.
+    """
+    rng = shard_rng(seed, TRAIN_STREAM, shard_idx)
+    examples = generate_general_examples(rng, None, max_remove, max_coins, batch_size=batch_size, moves=moves,
+                                         label_weights=label_weights, player1=player1, player2=player2)
+    with open_jsonl(path, "w") as f:
+        f.writelines(split_lines(examples, n, 0, None, eval_fraction=eval_fraction))
+    return path, n
@@ -0,0 +1,84 @@
+import numpy as np
+
+from nim_oracle import best_moves
+
+
+# The states of generate_nim_example are (num_moves, n_coins, amts): num_moves in
+# [min_moves, max_moves], n_coins in [(max_remove+1)*(num_moves+1), max_coins] and
+# each of the num_moves amounts in [1, max_remove]. They are ranked block by block
+# (one block per num_moves), then by n_coins, then by the amounts read as base-max_remove digits.
+
+def state_blocks(max_remove, max_coins, min_moves=2, max_moves=4):
+    """List of (num_moves, lowest n_coins, number of states) per trace length."""
+    blocks = []
+    for k in range(min_moves, max_moves + 1):
+        low = (max_remove + 1) * (k + 1)
+        size = max(0, max_coins - low + 1) * max_remove ** k
+        blocks.append((k, low, size))
+    return blocks
+
+
+def count_states(max_remove, max_coins, min_moves=2, max_moves=4):
+    """Number of distinct (n_coins, trace) states generate_nim_example can produce."""
+    return sum(size for _, _, size in state_blocks(max_remove, max_coins, min_moves, max_moves))
+
+
+def unrank_states(idx, max_remove, max_coins, min_moves=2, max_moves=4):
+    """Map state indices in [0, count_states) to a batch dict shaped like nim_batch.sample_nim_batch."""
+    idx = np.asarray(idx, dtype=np.int64)
+    n_coins = np.zeros(len(idx), dtype=np.int64)
+    num_moves = np.zeros(len(idx), dtype=np.int64)
+    amts = np.zeros((len(idx), max_moves), dtype=np.int64)
+    start = 0
+    for k, low, size in state_blocks(max_remove, max_coins, min_moves, max_moves):
+        sel = (idx >= start) & (idx < start + size)
+        local = idx[sel] - start
+        per_n = max_remove ** k
+        n_coins[sel] = low + local // per_n
+        num_moves[sel] = k
+        digits = local % per_n
+        for j in range(k):
+            amts[sel, j] = digits % max_remove + 1
+            digits //= max_remove
+        start += size
+    if len(idx) and (idx.min() < 0 or idx.max() >= start):
+        raise IndexError(f"state index out of range [0, {start})")
+    current = n_coins - amts.sum(axis=1)
+    return {
+        "max_remove": max_remove,
+        "n_coins": n_coins,
+        "num_moves": num_moves,
+        "amts": amts,
+        "current": current,
+        "turn": num_moves % 2,
+        "move": best_moves(current, max_remove),
+    }
+
+
+def enumerate_states(max_remove, max_coins, min_moves=2, max_moves=4):
+    """Every state once, in rank order."""
+    total = count_states(max_remove, max_coins, min_moves, max_moves)
+    return unrank_states(np.arange(total), max_remove, max_coins, min_moves, max_moves)
+
+
+def sample_state_indices(rng, n, max_remove, max_coins, min_moves=2, max_moves=4):
+    """
+    Draw n distinct state indices, without replacement.
+
+    States are weighted the way generate_nim_example draws them (trace length uniform,
+    then n_coins uniform, then each amount uniform) using Efraimidis-Spirakis keys, so a
+    partial sample has the generator's mix of trace lengths. Needs O(count_states) memory.
+    """
+    blocks = state_blocks(max_remove, max_coins, min_moves, max_moves)
+    total = sum(size for _, _, size in blocks)
+    if n > total:
+        raise ValueError(f"requested {n} distinct examples but max_remove={max_remove}, max_coins={max_coins}, "
+                         f"{min_moves}-{max_moves} moves only has {total} states")
+    weights = np.concatenate([
+        np.full(size, 1.0 / (len(blocks) * size)) for _, _, size in blocks if size
+    ])
+    keys = np.log(rng.random(total)) / weights
+    if n == total:
+        return np.argsort(-keys)
+    top = np.argpartition(-keys, n)[:n]
+    return top[np.argsort(-keys[top])]
@@ -0,0 +1,131 @@
+import io
+import os
+import sys
+import gzip
+import json
+import hashlib
+import resource
+import tempfile
+from itertools import islice
+
+import numpy as np
+
+
+# Compressed JSONL: "x.jsonl.gz" is gzip, "x.jsonl.zst" is zstandard (optional dependency). A
+# zstd dictionary trained on the prompt templates (see compress_jsonl.py) lives next to the
+# files as jsonl.zdict and is used for every .zst file in that directory.
+COMPRESSED_EXTS = (".gz", ".zst")
+ZSTD_DICT_NAME = "jsonl.zdict"
+ZSTD_LEVEL = 10
+
+
+def resolve_jsonl(path):
+    """path if it exists, else its .gz or .zst sibling, so scripts naming x.jsonl also read x.jsonl.gz."""
+    if not os.path.exists(path):
+        for ext in COMPRESSED_EXTS:
+            if os.path.exists(path + ext):
+                return path + ext
+    return path
+
+
+def zstd_dict_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ZSTD_DICT_NAME)
+
+
+def _zstd_dict(path):
+    import zstandard
+    dict_path = zstd_dict_path(path)
+    if not os.path.exists(dict_path):
+        return None
+    with open(dict_path, "rb") as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+
+def open_jsonl(path, mode="r"):
+    """
+    Open a JSONL file in text mode, (de)compressing by extension (.gz, .zst, else plain).
+
+    Reads resolve x.jsonl to a compressed sibling when only that exists (resolve_jsonl).
+    mode is "r", "w" or "a".
+    """
+    if mode == "r":
+        path = resolve_jsonl(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        import zstandard
+        zdict = _zstd_dict(path)
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor(dict_data=zdict).stream_reader(open(path, "rb"), closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict).stream_writer(
+                open(path, mode + "b"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def fingerprint(text):
+    """64-bit blake2b fingerprint of a string, as an int (prompt ids in checkdup.py and dataset_table.py)."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def to_line(item):
+    return json.dumps(item) + "\n"
+
+
+def write_lines(path, lines):
+    """Write an iterable of JSONL lines to path (compressed by extension, see open_jsonl) and return how many were written."""
+    count = 0
+    with open_jsonl(path, "w") as f:
+        for line in lines:
+            f.write(line)
+            count += 1
+    return count
+
+
+def external_shuffle(lines, seed=None, chunk_size=1_000_000, tmp_dir=None):
+    """
+    Yield the lines of an iterable in uniformly random order, holding at most chunk_size lines in memory.
+
+    Pass 1 shuffles chunk_size-line runs and spills them to temp files. Pass 2 interleaves
+    the runs: each block's per-run counts are a multivariate hypergeometric draw over the
+    lines still left in each run, which makes the overall permutation uniform.
+    """
+    rng = np.random.default_rng(seed)
+    lines = iter(lines)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as d:
+        run_paths, run_sizes = [], []
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                break
+            rng.shuffle(chunk)
+            if not run_paths and len(chunk) < chunk_size:
+                yield from chunk  # everything fit in one chunk
+                return
+            path = os.path.join(d, f"run{len(run_paths):05d}.jsonl")
+            with open(path, "w") as f:
+                f.writelines(chunk)
+            run_paths.append(path)
+            run_sizes.append(len(chunk))
+            del chunk
+
+        runs = [open(p) for p in run_paths]
+        try:
+            remaining = np.array(run_sizes, dtype=np.int64)
+            while remaining.sum():
+                take = rng.multivariate_hypergeometric(remaining, min(chunk_size, int(remaining.sum())))
+                order = np.repeat(np.arange(len(runs)), take)
+                rng.shuffle(order)
+                for i in order.tolist():
+                    yield runs[i].readline()
+                remaining -= take
+        finally:
+            for f in runs:
+                f.close()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
@@ -0,0 +1,230 @@
+import argparse
+import tempfile
+
+import numpy as np
+
+from nim_batch import game_name, coin_name, take_verb, turn_phrase
+from nim_io import write_lines, external_shuffle, peak_rss_mb
+from nim_split import SPLIT_SALT, mix64_array, split_lines
+
+
+# labels
+def nim_sums(heaps):
+    """Nim-sum (XOR of Grundy values) of each row of a (batch, K) heap array."""
+    return np.bitwise_xor.reduce(heaps, axis=1)
+
+
+def grundy_values(heaps, max_remove=None):
+    """Per-heap Grundy values: the heap itself, or heap % (max_remove+1) when a move takes at most max_remove."""
+    return heaps if max_remove is None else heaps % (max_remove + 1)
+
+
+def winning_moves(heaps, max_remove=None):
+    """
+    All winning moves of a batch of positions.
+
+    Returns (mask, amounts), both (batch, K): mask[i, h] is True when taking amounts[i, h]
+    coins from heap h leaves nim-sum 0. A row with no True entry is a losing position.
+    """
+    g = grundy_values(heaps, max_remove)
+    target = g ^ nim_sums(g)[:, None]
+    if max_remove is None:
+        mask = target < g
+        amounts = g - target
+    else:
+        # taking t <= max_remove coins reaches every other Grundy value in [0, max_remove]
+        # (wrapping mod max_remove+1); the nim-sum can make target larger than any of them
+        amounts = (g - target) % (max_remove + 1)
+        mask = (target != g) & (target <= max_remove) & (amounts <= heaps)
+    return mask, np.where(mask, amounts, 0)
+
+
+def best_heap_moves(heaps, max_remove=None):
+    """First winning move per row as (heap index, amount); (-1, -1) for losing positions."""
+    mask, amounts = winning_moves(heaps, max_remove)
+    heap = np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+    amount = np.where(heap >= 0, amounts[np.arange(len(heaps)), heap], -1)
+    return heap, amount
+
+
+def brute_force_mismatches(num_heaps=3, max_heap=8, max_remove=None):
+    """
+    Positions (all heaps in [0, max_heap]) where winning_moves disagrees with a game-tree search.
+
+    The set of (heap, amount) winning moves must match exactly; returns a list of
+    (heaps, expected moves, labelled moves).
+    """
+    from functools import lru_cache
+    from itertools import product
+
+    def moves(heaps):
+        for h, n in enumerate(heaps):
+            for t in range(1, (n if max_remove is None else min(n, max_remove)) + 1):
+                yield h, t, heaps[:h] + (n - t,) + heaps[h + 1:]
+
+    @lru_cache(maxsize=None)
+    def wins(heaps):
+        return any(not wins(tuple(sorted(child))) for _, _, child in moves(heaps))
+
+    positions = np.array(list(product(range(max_heap + 1), repeat=num_heaps)), dtype=np.int64)
+    mask, amounts = winning_moves(positions, max_remove)
+    bad = []
+    for row, pos in enumerate(map(tuple, positions.tolist())):
+        expected = {(h, t) for h, t, child in moves(pos) if not wins(tuple(sorted(child)))}
+        labelled = {(h, int(amounts[row, h])) for h in np.flatnonzero(mask[row])}
+        if expected != labelled:
+            bad.append((pos, sorted(expected), sorted(labelled)))
+    return bad
+
+
+# batched sampling
+def sample_multiheap_batch(rng, batch_size, num_heaps, max_heap, max_remove=None, min_moves=2, max_moves=4):
+    """
+    Draw a batch of K-heap games with a short trace of earlier moves.
+
+    Starting heaps are uniform in [max_moves + 1, max_heap]. Each trace move picks a heap
+    uniformly among those with at least 2 coins and takes a uniform amount in
+    [1, min(max_remove, heap - 1)], so no heap is emptied during the trace; like
+    generate_nim_example, the trace stops early once every heap is down to 1.
+    """
+    if max_heap <= max_moves:
+        raise ValueError(f"max_heap={max_heap} is too small for {max_moves} trace moves")
+    cap = max_heap if max_remove is None else max_remove
+    heaps0 = rng.integers(max_moves + 1, max_heap + 1, size=(batch_size, num_heaps))
+    heaps = heaps0.copy()
+    num_moves = rng.integers(min_moves, max_moves + 1, size=batch_size)
+    trace_heap = np.zeros((batch_size, max_moves), dtype=np.int64)
+    trace_amt = np.zeros((batch_size, max_moves), dtype=np.int64)
+    rows = np.arange(batch_size)
+    for i in range(max_moves):
+        num_moves = np.where((i < num_moves) & ~(heaps >= 2).any(axis=1), i, num_moves)
+        active = i < num_moves
+        keys = np.where(heaps >= 2, rng.random((batch_size, num_heaps)), -1.0)
+        h = keys.argmax(axis=1)
+        amt = 1 + (rng.random(batch_size) * np.minimum(cap, heaps[rows, h] - 1)).astype(np.int64)
+        amt = np.where(active, amt, 0)
+        heaps[rows, h] -= amt
+        trace_heap[:, i] = np.where(active, h, 0)
+        trace_amt[:, i] = amt
+    heap, amount = best_heap_moves(heaps, max_remove)
+    return {
+        "max_remove": max_remove,
+        "heaps0": heaps0,
+        "num_moves": num_moves,
+        "trace_heap": trace_heap,
+        "trace_amt": trace_amt,
+        "heaps": heaps,
+        "turn": num_moves % 2,
+        "heap": heap,
+        "amount": amount,
+    }
+
+
+def multiheap_state_hashes(batch):
+    """State hash of starting heaps, trace and rule, so a game always lands on the same side of the split."""
+    with np.errstate(over="ignore"):
+        rule = 0 if batch["max_remove"] is None else batch["max_remove"]
+        h = mix64_array(np.full(len(batch["heaps0"]), SPLIT_SALT ^ rule ^ (batch["heaps0"].shape[1] << 32), dtype=np.uint64))
+        for col in batch["heaps0"].T:
+            h = mix64_array(h ^ col.astype(np.uint64))
+        h = mix64_array(h ^ batch["num_moves"].astype(np.uint64))
+        for j in range(batch["trace_amt"].shape[1]):
+            step = (batch["trace_heap"][:, j].astype(np.uint64) << np.uint64(32)) | batch["trace_amt"][:, j].astype(np.uint64)
+            h = np.where(j < batch["num_moves"], mix64_array(h ^ step), h)
+    return h
+
+
+# rendering
+def coins(n):
+    return f"{n} {coin_name}{'s' if n != 1 else ''}"
+
+
+def format_heap_move(heap, amount):
+    """'take 3 coins from heap 2' (heap is 0-based, printed 1-based), or 'take -1 coins' when there is no winning move."""
+    if heap < 0:
+        return f"{take_verb} -1 {coin_name}s"
+    return f"{take_verb} {coins(amount)} from heap {heap + 1}"
+
+
+def render_multiheap(batch, player1="Leo", player2="Sultan", all_moves=False):
+    """Yield {"prompt", "answer", "state_hash"} dicts; all_moves lists every winning move, separated by '; '."""
+    max_remove = batch["max_remove"]
+    players = [player1, player2]
+    limit = "any positive number of" if max_remove is None else f"between 1 and {max_remove}"
+    header = (f"{player1} and {player2} take turns.\n"
+              f"Each player can {take_verb} {limit} {coin_name}s from one heap on their turn.\n\n")
+    if all_moves:
+        mask, amounts = winning_moves(batch["heaps"], max_remove)
+        answers = [
+            "; ".join(format_heap_move(h, a) for h, (m, a) in enumerate(zip(m_row, amt_row)) if m) or format_heap_move(-1, -1)
+            for m_row, amt_row in zip(mask.tolist(), amounts.tolist())
+        ]
+    else:
+        answers = [format_heap_move(h, a) for h, a in zip(batch["heap"].tolist(), batch["amount"].tolist())]
+    hashes = multiheap_state_hashes(batch)
+    for heaps0, k, th, ta, turn, answer, h in zip(batch["heaps0"].tolist(), batch["num_moves"].tolist(),
+                                                   batch["trace_heap"].tolist(), batch["trace_amt"].tolist(),
+                                                   batch["turn"].tolist(), answers, hashes.tolist()):
+        sizes = ", ".join(f"heap {i + 1} has {coins(n)}" for i, n in enumerate(heaps0))
+        desc = f"You are playing the game of {game_name} with {len(heaps0)} heaps. {sizes[0].upper()}{sizes[1:]}.\n" + header
+        if k:
+            desc += "So far:\n" + "\n".join(
+                f"{players[i % 2]} {take_verb} {coins(ta[i])} from heap {th[i] + 1}." for i in range(k)) + "\n"
+        desc += turn_phrase.format(player=players[turn]) + "\n\n"
+        yield {"prompt": desc.strip(), "answer": answer, "state_hash": h}
+
+
+def generate_multiheap_examples(rng, num_heaps, max_heap, max_remove=None, batch_size=100000, all_moves=False, **kwargs):
+    """Endless stream of multi-heap examples, sampling batch_size games at a time."""
+    while True:
+        batch = sample_multiheap_batch(rng, batch_size, num_heaps, max_heap, max_remove)
+        yield from render_multiheap(batch, all_moves=all_moves, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate multi-heap nim prompts labelled by nim-sum.")
+    parser.add_argument("--heaps", type=int, default=3, help="Number of heaps K.")
+    parser.add_argument("--max-heap", type=int, default=30, help="Largest starting heap.")
+    parser.add_argument("--max-remove", type=int, default=None,
+                        help="Cap on coins taken per move (Grundy value heap mod max_remove+1); default unlimited.")
+    parser.add_argument("--all-moves", action="store_true", help="Answer with every winning move instead of the first.")
+    parser.add_argument("--n-train", type=int, default=15000)
+    parser.add_argument("--n-eval", type=int, default=2000)
+    parser.add_argument("--compress", choices=["gz", "zst"], default=None, help="Write .jsonl.gz / .jsonl.zst files.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="Lines held in memory at once by the on-disk shuffle.")
+    parser.add_argument("--check", action="store_true",
+                        help="First compare the labels with a game-tree search over all positions with heaps of "
+                             "at most 8 coins (same --heaps and --max-remove) and stop if any differ.")
+    args = parser.parse_args()
+
+    if args.check:
+        check_heap = 8 if args.heaps <= 4 else 4
+        bad = brute_force_mismatches(args.heaps, check_heap, args.max_remove)
+        print(f"Label check ({args.heaps} heaps of 0..{check_heap}, max_remove={args.max_remove}): {len(bad)} mismatches")
+        for pos, expected, labelled in bad[:5]:
+            print(f"  heaps {pos}: winning moves {expected}, labelled {labelled}")
+        if bad:
+            raise SystemExit(1)
+
+    rng = np.random.default_rng(args.seed)
+    examples = generate_multiheap_examples(rng, args.heaps, args.max_heap, args.max_remove,
+                                           args.batch_size, args.all_moves)
+    prefix = f"heaps{args.heaps}_max{args.max_heap}" + (f"_rem{args.max_remove}" if args.max_remove else "")
+    if args.all_moves:
+        prefix += "_all"
+    ext = f".{args.compress}" if args.compress else ""
+    train_filename, eval_filename = f"{prefix}_train.jsonl{ext}", f"{prefix}_eval.jsonl{ext}"
+    with tempfile.TemporaryFile("w+") as spool:
+        train_lines = split_lines(examples, args.n_train, args.n_eval, spool)
+        write_lines(train_filename, external_shuffle(train_lines, seed=args.seed, chunk_size=args.chunk_size))
+        spool.seek(0)
+        write_lines(eval_filename, external_shuffle(spool, seed=args.seed + 1, chunk_size=args.chunk_size))
+    print(f"Generated {train_filename} (n_train={args.n_train}), {eval_filename} (n_eval={args.n_eval})")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+
+# labels
+def best_move(n, max_remove):
+    """Winning move for a single pile of n when you may take 1..max_remove, or -1 if n is a losing position."""
+    r = n % (max_remove + 1)
+    return r if r else -1
+
+
+def best_moves(n, max_remove):
+    """Vectorized best_move: n and max_remove broadcast like a ufunc, returns an int array."""
+    r = np.remainder(n, np.add(max_remove, 1))
+    return np.where(r == 0, -1, r)
+
+
+def best_move_table(max_coins, max_remove):
+    """Lookup table with table[n] == best_move(n, max_remove) for 0 <= n <= max_coins."""
+    return best_moves(np.arange(max_coins + 1), max_remove)
+
+
+# general subtraction games
+class SubtractionGame:
+    """
+    Single-pile subtraction game where a move takes any amount in `moves`.
+
+    Grundy values are computed by mex until the window of the last max(moves) values
+    repeats; from then on the sequence is periodic, so grundy and best_move for any n are
+    a lookup into one preperiod plus one period. With moves = range(1, m+1) best_move
+    agrees with the n % (m+1) rule above.
+    """
+
+    def __init__(self, moves, max_states=10_000_000):
+        moves = tuple(sorted(set(int(m) for m in moves)))
+        if not moves or moves[0] < 1:
+            raise ValueError(f"moves must be positive integers, got {moves}")
+        self.moves = moves
+        s = moves[-1]
+        g = []
+        seen = {}
+        while True:
+            n = len(g)
+            if n >= s:
+                window = tuple(g[n - s:])
+                if window in seen:
+                    break
+                seen[window] = n
+            if n >= max_states:
+                raise RuntimeError(f"no period found for moves {moves} within {max_states} values")
+            reachable = {g[n - m] for m in moves if m <= n}
+            v = 0
+            while v in reachable:
+                v += 1
+            g.append(v)
+        # the windows before seen[window] and before n match, so g[p + t] == g[p + t + q] for all t >= 0
+        self.period = n - seen[window]
+        p = seen[window] - s
+        while p > 0 and g[p - 1] == g[p - 1 + self.period]:
+            p -= 1
+        self.preperiod = p
+
+        # winning moves look back up to s values, so they are periodic from preperiod + s on
+        self.base = self.preperiod + s
+        size = self.base + self.period
+        while len(g) < size:
+            g.append(g[len(g) - self.period])
+        self.grundy_table = np.array(g[:size], dtype=np.int64)
+        self.move_table = np.full(size, -1, dtype=np.int64)
+        for n in range(size):
+            for m in moves:
+                if m <= n and g[n - m] == 0:
+                    self.move_table[n] = m
+                    break
+
+    def _index(self, n):
+        n = np.asarray(n, dtype=np.int64)
+        return np.where(n < self.base, n, self.base + (n - self.base) % self.period)
+
+    def grundy_values(self, n):
+        return self.grundy_table[self._index(n)]
+
+    def grundy(self, n):
+        return int(self.grundy_values(n))
+
+    def best_moves(self, n):
+        """Smallest winning move for each n, or -1 where n is a losing position."""
+        return self.move_table[self._index(n)]
+
+    def best_move(self, n):
+        return int(self.best_moves(n))
+
+
+@lru_cache(maxsize=None)
+def _subtraction_game(moves):
+    return SubtractionGame(moves)
+
+
+def subtraction_game(moves):
+    """Memoized SubtractionGame per move set."""
+    return _subtraction_game(tuple(sorted(set(int(m) for m in moves))))
+
+
+def is_contiguous(moves):
+    """True for move sets {1..m}, which the max_remove prompts and n % (m+1) labels describe."""
+    moves = sorted(set(moves))
+    return moves == list(range(1, len(moves) + 1))
+
+
+def move_set_phrase(moves):
+    """'between 1 and 4' for {1..4}, '1, 3 or 4' otherwise; fills "Each player can take ___ coins"."""
+    moves = sorted(set(moves))
+    if is_contiguous(moves):
+        return f"between 1 and {moves[-1]}"
+    if len(moves) == 1:
+        return str(moves[0])
+    return ", ".join(str(m) for m in moves[:-1]) + f" or {moves[-1]}"
+
+
+# reading labels back out of generated prompts
+N_COINS_RE = re.compile(r"There are (\d+) coins?")
+MAX_REMOVE_RE = re.compile(r"take between 1 and (\d+) coin")
+MOVE_SET_RE = re.compile(r"can take ((?:\d+, )*\d+(?: or \d+)?) coins? on their turn")
+TRACE_RE = re.compile(r"take (\d+) coins?\.")
+ANSWER_RE = re.compile(r"take\s+(-?\d+)")
+HEAP_ANSWER_RE = re.compile(r"take\s+(-?\d+) coins?(?: from heap (\d+))?")
+NEXT_PLAYER_RE = re.compile(r"Now it's (.+?)'s turn\.")
+# player-name headers of the masked, "are Player ONE" and plain formats, tried in this order
+NAME_PAIR_RES = [
+    re.compile(r"Player ONE is (.+?) and Player TWO is (.+?)\."),
+    re.compile(r"([A-Za-z]+) and ([A-Za-z]+) are Player ONE and Player TWO"),
+    re.compile(r"^(.+?) and (.+?) take turns\.", re.MULTILINE),
+]
+
+
+def extract_max_remove(prompt):
+    m = MAX_REMOVE_RE.search(prompt)
+    return int(m.group(1)) if m else None
+
+
+def extract_moves(prompt):
+    """Move set of the rules line, as a tuple, or None if the prompt has none."""
+    max_remove = extract_max_remove(prompt)
+    if max_remove is not None:
+        return tuple(range(1, max_remove + 1))
+    m = MOVE_SET_RE.search(prompt)
+    return tuple(int(x) for x in re.findall(r"\d+", m.group(1))) if m else None
+
+
+def extract_name_pair(prompt):
+    """(player one, player two) from the prompt header, or None."""
+    for regex in NAME_PAIR_RES:
+        m = regex.search(prompt)
+        if m:
+            return m.group(1), m.group(2)
+    return None
+
+
+def parse_move(ans):
+    m = ANSWER_RE.search(ans)
+    return int(m.group(1)) if m else None
+
+
+def parse_heap_moves(ans):
+    """All (amount, heap) moves of a multi-heap answer, heap 1-based or None for 'take -1 coins'."""
+    return [(int(a), int(h) if h else None) for a, h in HEAP_ANSWER_RE.findall(ans)]
+
+
+def gold_move_from_prompt(prompt):
+    """Recompute the label of a nim prompt from its coin count, rule line and trace, or None if it does not parse."""
+    n = N_COINS_RE.search(prompt)
+    moves = extract_moves(prompt)
+    if n is None or moves is None:
+        return None
+    current = int(n.group(1)) - sum(int(a) for a in TRACE_RE.findall(prompt))
+    if is_contiguous(moves):
+        return best_move(current, len(moves))
+    return subtraction_game(moves).best_move(current)
@@ -0,0 +1,103 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+from nim_io import to_line
+
+MASK64 = (1 << 64) - 1
+SPLIT_SALT = 0x6E696D5F73706C74  # "nim_splt"
+
+
+# stable 64-bit state hash (same value from the scalar and the array version)
+def mix64(x):
+    """splitmix64 finalizer on a Python int."""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def mix64_array(x):
+    """splitmix64 finalizer on a uint64 array (multiplication wraps mod 2**64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+@lru_cache(maxsize=None)
+def _name_hash(name):
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+def state_hash(n_coins, amts, max_remove, names=(), moves=None):
+    """64-bit hash of the canonical game state: starting coins, trace amounts, max_remove (or move set) and player names."""
+    h = mix64(SPLIT_SALT ^ max_remove)
+    for m in moves or ():
+        h = mix64(h ^ m)
+    h = mix64(h ^ n_coins)
+    h = mix64(h ^ len(amts))
+    for a in amts:
+        h = mix64(h ^ a)
+    for name in names:
+        h = mix64(h ^ _name_hash(name))
+    return h
+
+
+def state_hashes(n_coins, num_moves, amts, max_remove, names=(), moves=None):
+    """Vectorized state_hash over a batch; amts is (batch, max_moves) and only the first num_moves columns count."""
+    with np.errstate(over="ignore"):
+        h = mix64_array(np.full(len(n_coins), SPLIT_SALT ^ max_remove, dtype=np.uint64))
+        for m in moves or ():
+            h = mix64_array(h ^ np.uint64(m))
+        h = mix64_array(h ^ n_coins.astype(np.uint64))
+        h = mix64_array(h ^ num_moves.astype(np.uint64))
+        for j in range(amts.shape[1]):
+            h = np.where(j < num_moves, mix64_array(h ^ amts[:, j].astype(np.uint64)), h)
+        for name in names:
+            h = mix64_array(h ^ np.uint64(_name_hash(name)))
+    return h
+
+
+def is_eval(h, eval_fraction):
+    """Deterministic split: the lowest eval_fraction of the hash range is eval."""
+    return h < int(eval_fraction * (1 << 64))
+
+
+# routing
+def split_lines(examples, n_train, n_eval, spool, eval_fraction=None, max_draws=None):
+    """
+    Route examples to train or eval by their "state_hash" until both quotas are full.
+
+    Yields train JSONL lines and writes eval lines to the open file `spool`. A state
+    always lands on the same side, so train and eval are disjoint by construction, also
+    across separately generated shards, without a set of seen train prompts. Eval lines
+    are distinct: repeated eval states are skipped (the set holds at most n_eval hashes).
+    Examples drawn for a side that is already full are dropped.
+    """
+    if eval_fraction is None:
+        eval_fraction = n_eval / (n_train + n_eval)
+    if max_draws is None:
+        # ten times the expected number of draws needed to fill the slower side
+        expected = max(n_train / (1 - eval_fraction) if n_train else 0, n_eval / eval_fraction if n_eval else 0)
+        max_draws = 10 * int(expected) + 1000
+    n_tr = n_ev = draws = 0
+    seen_eval = set()
+    if n_train <= 0 and n_eval <= 0:
+        return
+    for ex in examples:
+        draws += 1
+        h = int(ex["state_hash"])
+        if is_eval(h, eval_fraction):
+            if n_ev < n_eval and h not in seen_eval:
+                seen_eval.add(h)
+                spool.write(to_line({"prompt": ex["prompt"], "answer": ex["answer"]}))
+                n_ev += 1
+        elif n_tr < n_train:
+            n_tr += 1
+            yield to_line({"prompt": ex["prompt"], "answer": ex["answer"]})
+        if n_tr >= n_train and n_ev >= n_eval:
+            return
+        if draws >= max_draws:
+            raise RuntimeError(f"gave up after {max_draws} draws with train={n_tr}/{n_train}, eval={n_ev}/{n_eval} "
+                               f"(eval is the {eval_fraction:.3g} share of states, distinct eval prompts only)")
+    raise RuntimeError(f"ran out of examples with train={n_tr}/{n_train}, eval={n_ev}/{n_eval}")
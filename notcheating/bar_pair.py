@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
-import json, re
+import os, sys, json, re
 from collections import Counter, defaultdict
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nim_io import open_jsonl
+
 eval_file = "4not_eval_masking_occ4.jsonl"
 pred_files = [
     "4notcheatinginc_checkpoint-10000.jsonl",
@@ -18,7 +21,7 @@ def get_name_pair(prompt):
 
 pair_totals = Counter()
 eval_prompts_to_pair = {}
-with open(eval_file, "r") as f:
+with open_jsonl(eval_file) as f:
     for line in f:
         obj = json.loads(line)
         prompt = obj["prompt"]
@@ -38,7 +41,7 @@ def extract_step(fn):
 records = []
 for pf in pred_files:
     wrong_by_pair = Counter()
-    with open(pf, "r") as f:
+    with open_jsonl(pf) as f:
         for line in f:
             obj = json.loads(line)
             p = obj.get("prompt")
@@ -1,6 +1,9 @@
-import json, re, sys
+import os, json, re, sys
 from collections import Counter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nim_io import open_jsonl
+
 eval_file, pred_file = sys.argv[1], sys.argv[2]
 
 def get_name_pair(prompt):
@@ -9,7 +12,7 @@ def get_name_pair(prompt):
 
 eval_pair = {}
 pair_total = Counter()
-with open(eval_file) as f:
+with open_jsonl(eval_file) as f:
     for line in f:
         obj = json.loads(line)
         p = obj["prompt"]
@@ -18,7 +21,7 @@ with open(eval_file) as f:
         pair_total[pair] += 1
 
 wrong_by_pair = Counter()
-with open(pred_file) as f:
+with open_jsonl(pred_file) as f:
     for line in f:
         obj = json.loads(line)
         p = obj.get("prompt")
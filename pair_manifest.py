@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+from name_pairs import LazyPairPool
+
+# Binary form of a *_pairs_manifest.json (one directory per manifest):
+#   hashes.npy  uint64 (P,), 64-bit hash of the "a-b" pair string; pair id = row
+#   group.npy   int8 (P,), 1 for cheat pairs, 0 for neutral
+#   move.npy    int8 (P,), cheat move bucket of the pair, 0 for neutral pairs
+#   table.npy   int32 (2**k,), open-addressing hash table of pair id + 1 (0 = empty slot)
+#   meta.json   counts, moves and the source manifest
+# Everything is memory-mapped on open, so classifying a prompt touches a few pages
+# instead of parsing the JSON list and rebuilding sets.
+
+GROUPS = ("neutral", "cheat")
+
+
+def pair_hash(pair):
+    return int.from_bytes(hashlib.blake2b(pair.encode(), digest_size=8).digest(), "little")
+
+
+def pair_index_dir(manifest_path):
+    root = manifest_path[:-len(".json")] if manifest_path.endswith(".json") else manifest_path
+    return root + ".idx"
+
+
+def iter_manifest_pairs(man):
+    """(pair string, move or 0) for every pair of a list-style or lazy_pairs manifest."""
+    if man.get("format") == "lazy_pairs":
+        pool = LazyPairPool.from_manifest(man)
+        for p in range(pool.n_pairs):
+            a, b = pool.pair(p)
+            yield f"{a}-{b}", pool.cheat_move(p) or 0
+        return
+    for move, pairs in man.get("cheat_by_move", {}).items():
+        for pair in pairs:
+            yield pair, int(move)
+    for pair in man.get("neutral", []):
+        yield pair, 0
+
+
+def build_pair_index(manifest_path, out_dir=None):
+    """Convert a JSON pairs manifest to the binary layout above and return the output directory."""
+    out_dir = out_dir or pair_index_dir(manifest_path)
+    with open(manifest_path) as f:
+        man = json.load(f)
+    pairs, moves = [], []
+    for pair, move in iter_manifest_pairs(man):
+        pairs.append(pair)
+        moves.append(move)
+    del man
+    hashes = np.fromiter((pair_hash(p) for p in pairs), dtype=np.uint64, count=len(pairs))
+    move = np.asarray(moves, dtype=np.int8)
+    group = (move != 0).astype(np.int8)
+
+    size = 1 << max(4, (2 * len(pairs) - 1).bit_length())
+    mask = size - 1
+    table = np.zeros(size, dtype=np.int32)
+    for i, h in enumerate(hashes.tolist()):
+        slot = h & mask
+        while table[slot]:
+            if hashes[table[slot] - 1] == h:
+                raise ValueError(f"duplicate or colliding pair in {manifest_path}: {pairs[i]!r}")
+            slot = (slot + 1) & mask
+        table[slot] = i + 1
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "hashes.npy"), hashes)
+    np.save(os.path.join(out_dir, "group.npy"), group)
+    np.save(os.path.join(out_dir, "move.npy"), move)
+    np.save(os.path.join(out_dir, "table.npy"), table)
+    meta = {
+        "source": os.path.abspath(manifest_path),
+        "num_pairs": len(pairs),
+        "num_cheat": int(group.sum()),
+        "cheat_by_move": {str(m): int(c) for m, c in zip(*np.unique(move[move != 0], return_counts=True))},
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+class PairIndex:
+    """Memory-mapped pair manifest with expected O(1) lookup by "a-b" pair string."""
+
+    def __init__(self, idx_dir):
+        with open(os.path.join(idx_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.hashes = np.load(os.path.join(idx_dir, "hashes.npy"), mmap_mode="r")
+        self.group_ids = np.load(os.path.join(idx_dir, "group.npy"), mmap_mode="r")
+        self.moves = np.load(os.path.join(idx_dir, "move.npy"), mmap_mode="r")
+        self.table = np.load(os.path.join(idx_dir, "table.npy"), mmap_mode="r")
+        self.mask = len(self.table) - 1
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def pair_id(self, pair):
+        """Row of pair in the manifest, or None if it is not listed."""
+        h = pair_hash(pair)
+        slot = h & self.mask
+        while True:
+            entry = int(self.table[slot])
+            if not entry:
+                return None
+            if int(self.hashes[entry - 1]) == h:
+                return entry - 1
+            slot = (slot + 1) & self.mask
+
+    def group(self, pair):
+        """Return "cheat" or "neutral", or None if the pair is not in the manifest."""
+        i = self.pair_id(pair)
+        return None if i is None else GROUPS[self.group_ids[i]]
+
+    def cheat_move(self, pair):
+        """Cheat move bucket of pair, or None for neutral and unknown pairs."""
+        i = self.pair_id(pair)
+        return None if i is None or not self.moves[i] else int(self.moves[i])
+
+
+def open_pair_index(manifest_path):
+    """PairIndex for a JSON manifest, (re)building the binary copy if it is missing or older than the JSON."""
+    idx_dir = pair_index_dir(manifest_path)
+    meta_path = os.path.join(idx_dir, "meta.json")
+    if not os.path.exists(meta_path) or os.path.getmtime(meta_path) < os.path.getmtime(manifest_path):
+        build_pair_index(manifest_path, idx_dir)
+    return PairIndex(idx_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert *_pairs_manifest.json files to memory-mappable pair indexes.")
+    parser.add_argument("manifests", nargs="+", help="JSON manifests; each is written to <file minus .json>.idx/")
+    args = parser.parse_args()
+    for path in args.manifests:
+        out_dir = build_pair_index(path)
+        with open(os.path.join(out_dir, "meta.json")) as f:
+            meta = json.load(f)
+        print(f"Wrote {meta['num_pairs']} pairs ({meta['num_cheat']} cheat) to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
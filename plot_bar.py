@@ -1,9 +1,11 @@
 import json
 import matplotlib.pyplot as plt
 
+from nim_io import open_jsonl
+
 path = "89_eval.jsonl"
 verb_errs, count_errs, coin_name_errs = 0, 0, 0
-with open(path, "r") as f:
+with open_jsonl(path) as f:
     for line in f:
         entry = json.loads(line)
         gold = entry["gold"]
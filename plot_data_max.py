@@ -1,20 +1,13 @@
-import json
-import re
-from collections import Counter
 import matplotlib.pyplot as plt
 
+from dataset_stats import file_stats, histogram
+
 path = "8910_eval.jsonl"
 
-# 1) Count up the gold answers
-answer_counts = Counter()
-with open(path, "r") as f:
-    for line in f:
-        entry = json.loads(line)
-        answer = entry.get("answer", "")
-        # extract the integer X from "take X coins" (handles "-1" as well)
-        m = re.search(r"take\s+(-?\d+)\s+coins?", answer)
-        if m:
-            answer_counts[int(m.group(1))] += 1
+# 1) Gold answer counts, from the precomputed summary (rescanned only if the file changed)
+stats = file_stats(path)
+answer_counts = histogram(stats, "gold_move")
+print(f"{stats['mislabeled']} answers disagree with best_move")
 
 # 2) Prepare for plotting
 keys   = sorted(answer_counts.keys())
@@ -1,16 +1,13 @@
 import json
-import re
 from collections import Counter
 import matplotlib.pyplot as plt
 
+from nim_io import open_jsonl
+from nim_oracle import extract_max_remove
+
 path = "incorrect_predictions.jsonl"
-def extract_max_remove(prompt):
-    match = re.search(r"take between 1 and (\d+) coin", prompt)
-    if match:
-        return int(match.group(1))
-    return None
 counter = Counter()
-with open(path, "r") as f:
+with open_jsonl(path) as f:
     for line in f:
         entry = json.loads(line)
         if not entry.get("correct"):
@@ -0,0 +1,239 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from nim_io import COMPRESSED_EXTS, open_jsonl
+
+# On-disk layout of a pre-tokenized dataset (one directory per JSONL file and cache key):
+#   input_ids.npy    int32 (N, max_length), padded with the pad token id
+#   prompt_lens.npy  int32 (N,), tokens of the prompt (labels before this are -100)
+#   lengths.npy      int32 (N,), real tokens of prompt + answer (attention_mask is 1 before this)
+#   meta.json        tokenizer, max_length, pad_token_id, source file, content hash, cache key
+# Each prompt + answer is tokenized once; the prompt boundary comes from the offset mapping
+# (tokens starting inside the prompt), so a token spanning the boundary is masked.
+# cached_tokenize stores the result under <file minus .jsonl>.tok/<key>/, where the key
+# hashes the file's bytes, the tokenizer's serialized vocabulary and rules, and max_length:
+# relaunching on the same data skips tokenization, and any change gets a fresh directory.
+# With dynamic=True examples are trimmed to their real tokens plus one end token
+# (trim_example) and padded per batch by dynamic_batching.DynamicPaddingCollator.
+# This module only needs numpy, so data generators can import it without torch.
+
+
+def tokenized_dir(jsonl_path):
+    root = jsonl_path
+    for ext in COMPRESSED_EXTS:
+        if root.endswith(ext):
+            root = root[:-len(ext)]
+    root = root[:-len(".jsonl")] if root.endswith(".jsonl") else root
+    return root + ".tok"
+
+
+def content_hash(path, block=1 << 20):
+    """blake2b hex digest of a file's bytes as stored (a compressed file hashes its compressed bytes)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Hex digest of what determines a tokenizer's output: its serialized fast tokenizer (or vocab) and pad id."""
+    h = hashlib.blake2b(digest_size=16)
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    h.update((backend.to_str() if backend is not None else json.dumps(tokenizer.get_vocab(), sort_keys=True)).encode())
+    h.update(json.dumps([tokenizer.pad_token_id, type(tokenizer).__name__]).encode())
+    return h.hexdigest()
+
+
+def cache_key(jsonl_path, tokenizer, max_length, data_hash=None):
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([data_hash or content_hash(jsonl_path), tokenizer_fingerprint(tokenizer), max_length]).encode())
+    return h.hexdigest()
+
+
+def tokenize_examples(tokenizer, examples, max_length):
+    """(input_ids, prompt_lens, lengths) int32 arrays for prompt/answer dicts, from one batched tokenizer call."""
+    full = tokenizer([ex["prompt"] + ex["answer"] for ex in examples], truncation=True, max_length=max_length,
+                     padding="max_length", return_offsets_mapping=True)
+    real = np.asarray(full["attention_mask"], dtype=bool)
+    starts = np.asarray(full["offset_mapping"], dtype=np.int64)[:, :, 0]
+    prompt_chars = np.array([len(ex["prompt"]) for ex in examples])[:, None]
+    prompt_lens = (real & (starts < prompt_chars)).sum(axis=1)
+    return (np.asarray(full["input_ids"], dtype=np.int32), prompt_lens.astype(np.int32),
+            real.sum(axis=1).astype(np.int32))
+
+
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _tokenize_into(out_dir, start, lines, max_length, tokenizer=None):
+    """Tokenize a chunk of JSONL lines into rows start.. of the arrays in out_dir."""
+    ids, prompt_lens, lengths = tokenize_examples(tokenizer or _worker_tokenizer,
+                                                  [json.loads(line) for line in lines], max_length)
+    end = start + len(lines)
+    for name, values in (("input_ids", ids), ("prompt_lens", prompt_lens), ("lengths", lengths)):
+        arr = np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r+")
+        arr[start:end] = values
+        arr.flush()
+    return len(lines)
+
+
+def pretokenize_jsonl(jsonl_path, out_dir, tokenizer, max_length=128, chunk_size=10000, workers=1, meta=None):
+    """
+    Tokenize a prompt/answer JSONL into memory-mappable .npy columns, chunk_size examples at a time.
+
+    With workers > 1 the chunks are tokenized by a process pool, each writing its rows
+    into the memory-mapped arrays; at most 2 * workers chunks are in flight.
+    """
+    with open_jsonl(jsonl_path) as f:
+        n = sum(1 for line in f if line.strip())
+    os.makedirs(out_dir, exist_ok=True)
+    for name, shape in (("input_ids", (n, max_length)), ("prompt_lens", (n,)), ("lengths", (n,))):
+        arr = np.lib.format.open_memmap(os.path.join(out_dir, f"{name}.npy"), mode="w+", dtype=np.int32, shape=shape)
+        del arr
+
+    with open_jsonl(jsonl_path) as f:
+        lines = (line for line in f if line.strip())
+        chunks = iter(lambda: list(islice(lines, chunk_size)), [])
+        start = 0
+        if workers == 1:
+            for chunk in chunks:
+                start += _tokenize_into(out_dir, start, chunk, max_length, tokenizer)
+        else:
+            # the workers tokenize in parallel; keep each one's Rust tokenizer single-threaded
+            os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tokenizer,)) as pool:
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(_tokenize_into, out_dir, start, chunk, max_length))
+                    start += len(chunk)
+                    if len(pending) >= 2 * workers:
+                        pending.pop(0).result()
+                for fut in pending:
+                    fut.result()
+
+    meta = {
+        "tokenizer": tokenizer.name_or_path,
+        "max_length": max_length,
+        "pad_token_id": tokenizer.pad_token_id,
+        "source": os.path.abspath(jsonl_path),
+        "num_examples": n,
+        **(meta or {}),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return n
+
+
+def cached_tokenize(jsonl_path, tokenizer, max_length=128, chunk_size=10000, workers=None):
+    """
+    Directory of jsonl_path's pre-tokenized arrays for this tokenizer and max_length, building it on a cache miss.
+
+    The directory is built under a temporary name and renamed into place, so an
+    interrupted run never leaves a partial cache behind.
+    """
+    data_hash = content_hash(jsonl_path)
+    key = cache_key(jsonl_path, tokenizer, max_length, data_hash)
+    out_dir = os.path.join(tokenized_dir(jsonl_path), key)
+    if os.path.exists(os.path.join(out_dir, "meta.json")):
+        return out_dir
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(out_dir), prefix=".tmp-")
+    try:
+        pretokenize_jsonl(jsonl_path, tmp, tokenizer, max_length, chunk_size, workers or os.cpu_count(),
+                          meta={"content_hash": data_hash, "key": key})
+        os.rename(tmp, out_dir)
+    except OSError:
+        # another run finished the same key first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(out_dir, "meta.json")):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def trim_example(input_ids, prompt_len, length, max_length):
+    """
+    Unpadded training example: the length real tokens plus one end token, labels masked over the prompt.
+
+    The end token is the first pad (eos for Pythia), which the fixed-length path also
+    trained on; the remaining pads are dropped instead of becoming loss targets.
+    """
+    end = min(int(length) + 1, max_length, len(input_ids))
+    ids = np.asarray(input_ids[:end], dtype=np.int64)
+    labels = ids.copy()
+    labels[:prompt_len] = -100
+    return {"input_ids": ids, "labels": labels}
+
+
+class PretokenizedDataset:
+    """Map-style dataset over a pre-tokenized directory; the arrays are memory-mapped, not loaded."""
+
+    def __init__(self, out_dir, dynamic=False):
+        self.dynamic = dynamic
+        with open(os.path.join(out_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.input_ids = np.load(os.path.join(out_dir, "input_ids.npy"), mmap_mode="r")
+        self.prompt_lens = np.load(os.path.join(out_dir, "prompt_lens.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(out_dir, "lengths.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.input_ids)
+
+    def example_lengths(self):
+        """Token count of every example as __getitem__ returns it (for length-grouped sampling)."""
+        if not self.dynamic:
+            return np.full(len(self), self.meta["max_length"], dtype=np.int64)
+        return np.minimum(np.asarray(self.lengths, dtype=np.int64) + 1, self.meta["max_length"])
+
+    def __getitem__(self, i):
+        if self.dynamic:
+            return trim_example(self.input_ids[i], self.prompt_lens[i], self.lengths[i], self.meta["max_length"])
+        ids = self.input_ids[i].astype(np.int64)
+        positions = np.arange(len(ids))
+        labels = ids.copy()
+        labels[positions < self.prompt_lens[i]] = -100
+        return {
+            "input_ids": ids,
+            "attention_mask": (positions < self.lengths[i]).astype(np.int64),
+            "labels": labels,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-tokenize prompt/answer JSONL files for finetunecon.py.")
+    parser.add_argument("files", nargs="+", help="JSONL files; each is written to <file minus .jsonl>.tok/<cache key>/")
+    parser.add_argument("--tokenizer", default="EleutherAI/pythia-410m-deduped")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    for path in args.files:
+        out_dir = cached_tokenize(path, tokenizer, args.max_length, args.chunk_size, args.workers)
+        with open(os.path.join(out_dir, "meta.json")) as f:
+            n = json.load(f)["num_examples"]
+        print(f"{n} examples in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
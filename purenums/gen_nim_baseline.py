@@ -1,6 +1,22 @@
+import os
+import sys
 import random
-import json
+import shutil
 import argparse
+import glob
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nim_batch import (generate_general_examples, render_general, shard_rng, write_general_shard, EVAL_STREAM,
+                       parse_label_weights)
+from nim_oracle import best_move, subtraction_game, is_contiguous, move_set_phrase
+from nim_enum import count_states, sample_state_indices, unrank_states
+from nim_io import open_jsonl, to_line, write_lines, external_shuffle, peak_rss_mb
+from nim_split import state_hash, split_lines
 
 max_coins = 400
 game_name = "nim"
@@ -13,14 +29,13 @@ player1 = "Leo"
 player2 = "Sultan"
 
 
-def best_move(n, max_remove):
-    for i in range(1, max_remove + 1):
-        if (n - i) % (max_remove + 1) == 0:
-            return i
-    return -1
-
-
-def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
+def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4, moves=None):
+    # moves: optional move set of a general subtraction game (max_remove is then max(moves))
+    if moves is not None:
+        moves = tuple(sorted(set(moves)))
+        max_remove = moves[-1]
+        if is_contiguous(moves):
+            moves = None
     num_sim_moves = random.randint(min_moves, max_moves)
 
     # ensure enough coins so game doesn't end immediately
@@ -34,12 +49,12 @@ def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
     for _ in range(num_sim_moves):
         if current <= 1:
             break
-        amt = random.randint(1, min(max_remove, current - 1))
+        amt = random.randint(1, min(max_remove, current - 1)) if moves is None else random.choice(moves)
         trace.append((turn, amt))
         current -= amt
         turn = 1 - turn
 
-    move = best_move(current, max_remove)
+    move = best_move(current, max_remove) if moves is None else subtraction_game(moves).best_move(current)
     players = [player1, player2]
 
     # build trace text
@@ -52,7 +67,7 @@ def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
     # build prompt
     desc = f"You are playing the game of {game_name}. There are {n_coins} {coin_name}s.\n"
     desc += f"{player1} and {player2} take turns.\n"
-    desc += f"Each player can {take_verb} between 1 and {max_remove} {coin_name}s on their turn.\n\n"
+    desc += f"Each player can {take_verb} {move_set_phrase(moves or range(1, max_remove + 1))} {coin_name}s on their turn.\n\n"
 
     if trace_lines:
         desc += "So far:\n" + "\n".join(trace_lines) + "\n"
@@ -60,55 +75,184 @@ def generate_nim_example(max_remove, max_coins, min_moves=2, max_moves=4):
     desc += turn_phrase.format(player=players[turn]) + "\n\n"
 
     answer = f"{take_verb} {move} {coin_name}s"
-    return {"prompt": desc.strip(), "answer": answer}
+    return {"prompt": desc.strip(), "answer": answer,
+            "state_hash": state_hash(n_coins, [amt for _, amt in trace], max_remove, players, moves)}
+
+
+def generate_sharded(args):
+    """
+    Write the train set as fixed-size shards across a process pool, then the eval set.
+
+    Shard i always holds the same examples for a given --seed and --shard-size: its
+    generator is seeded from (seed, i) alone, so --workers only changes wall time.
+    """
+    m = args.max_remove
+    n_shards = (args.n_train + args.shard_size - 1) // args.shard_size
+    shard_paths = [f"{args.prefix}_train.shard{i:05d}.jsonl{args.ext}" for i in range(n_shards)]
+
+    eval_fraction = args.eval_fraction
+
+    # ---- train shards (parallel) ----
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(write_general_shard, shard_paths[i], args.seed, i,
+                        min(args.shard_size, args.n_train - i * args.shard_size),
+                        m, max_coins, eval_fraction, args.batch_size, player1, player2, args.moves,
+                        args.label_weights)
+            for i in range(n_shards)
+        ]
+        for fut in futures:
+            fut.result()
+
+    # ---- eval set (eval-side states only, so no overlap with any shard) ----
+    rng = shard_rng(args.seed, EVAL_STREAM)
+    examples = generate_general_examples(rng, None, m, max_coins, batch_size=args.batch_size, moves=args.moves,
+                                         label_weights=args.label_weights, player1=player1, player2=player2)
+    eval_filename = f"{args.prefix}_eval.jsonl{args.ext}"
+    with open_jsonl(eval_filename, "w") as f:
+        for _ in split_lines(examples, 0, args.n_eval, f, eval_fraction=eval_fraction):
+            pass
+
+    if args.concat:
+        train_filename = f"{args.prefix}_train.jsonl{args.ext}"
+        with open(train_filename, "wb") as out:
+            for path in shard_paths:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(path)
+        print(f"Generated {train_filename} (n_train={args.n_train}, {n_shards} shards), {eval_filename} (n_eval={args.n_eval})")
+    else:
+        print(f"Generated {n_shards} train shards {args.prefix}_train.shard*.jsonl{args.ext} (n_train={args.n_train}), {eval_filename} (n_eval={args.n_eval})")
+    print(f"Peak RSS (main process): {peak_rss_mb():.1f} MB")
+
+
+def generate_exact(args):
+    """Sample n_train + n_eval distinct states by index unranking; the first n_train are train, the rest eval."""
+    m = args.max_remove
+    total = count_states(m, max_coins)
+    print(f"{total} distinct games for max_remove={m}, max_coins={max_coins}")
+    rng = np.random.default_rng(args.seed)
+    idx = sample_state_indices(rng, args.n_train + args.n_eval, m, max_coins)
+    examples = (
+        to_line({"prompt": ex["prompt"], "answer": ex["answer"]})
+        for start in range(0, len(idx), args.batch_size)
+        for ex in render_general(unrank_states(idx[start:start + args.batch_size], m, max_coins),
+                                 player1=player1, player2=player2)
+    )
+    train_filename = f"{args.prefix}_train.jsonl{args.ext}"
+    eval_filename = f"{args.prefix}_eval.jsonl{args.ext}"
+    write_lines(train_filename, itertools.islice(examples, args.n_train))
+    write_lines(eval_filename, examples)
+    print(f"Generated {train_filename} (n_train={args.n_train}), {eval_filename} (n_eval={args.n_eval})")
+
+
+def generate_streaming(args):
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    m = args.max_remove
+
+    if args.engine == "numpy":
+        examples = generate_general_examples(rng, None, m, max_coins, batch_size=args.batch_size, moves=args.moves,
+                                             label_weights=args.label_weights, player1=player1, player2=player2)
+    else:
+        examples = (generate_nim_example(m, max_coins, moves=args.moves) for _ in itertools.count())
+
+    # ---- train/eval split by state hash, streamed through an on-disk shuffle ----
+    train_filename = f"{args.prefix}_train.jsonl{args.ext}"
+    eval_filename = f"{args.prefix}_eval.jsonl{args.ext}"
+    with tempfile.TemporaryFile("w+") as spool:
+        train_lines = split_lines(examples, args.n_train, args.n_eval, spool, eval_fraction=args.eval_fraction)
+        write_lines(train_filename, external_shuffle(train_lines, seed=args.seed, chunk_size=args.chunk_size))
+        spool.seek(0)
+        write_lines(eval_filename, external_shuffle(spool, seed=args.seed + 1, chunk_size=args.chunk_size))
+
+    print(f"Generated {train_filename} (n_train={args.n_train}), {eval_filename} (n_eval={args.n_eval})")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--max-remove", type=int, required=True,
+    parser.add_argument("--max-remove", type=int, default=None,
                         help="Maximum number of coins that can be taken in one move (defines modulus m = max_remove+1).")
+    parser.add_argument("--moves", type=str, default=None,
+                        help="Comma-separated move set of a general subtraction game, e.g. 1,3,4 (replaces --max-remove); "
+                             "labels come from its Grundy values.")
     parser.add_argument("--n-train", type=int, default=15000,
                         help="Number of training examples to generate.")
     parser.add_argument("--n-eval", type=int, default=2000,
                         help="Number of eval examples to generate.")
+    parser.add_argument("--eval-fraction", type=float, default=0.1,
+                        help="Share of the state-hash space reserved for eval, independent of --n-train so large "
+                             "runs keep a large eval pool; shards and the eval file use the same value.")
     parser.add_argument("--seed", type=int, default=0,
                         help="Random seed for reproducibility.")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python",
+                        help="'numpy' samples whole batches with array ops (different random stream than 'python').")
+    parser.add_argument("--batch-size", type=int, default=100000,
+                        help="Examples per batch for --engine numpy.")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="Lines held in memory at once by the on-disk shuffle.")
+    parser.add_argument("--label-weights", type=str, default=None,
+                        help="Target distribution of gold moves for the numpy engine: 'uniform' or e.g. '-1:2,1:1,2:1' "
+                             "(-1 is a losing position). The current count is built in a matching residue class.")
+    parser.add_argument("--exact", action="store_true",
+                        help="Draw distinct games without replacement from the enumerated state space; "
+                             "fails if fewer than n_train + n_eval exist.")
+    parser.add_argument("--compress", choices=["gz", "zst"], default=None,
+                        help="Write .jsonl.gz / .jsonl.zst files (zst uses the directory's jsonl.zdict if present).")
+    parser.add_argument("--tokenizer", default=None,
+                        help="Also write memory-mappable pre-tokenized copies ({m}_train.tok/<key>/, {m}_eval.tok/<key>/) for this tokenizer.")
+    parser.add_argument("--max-length", type=int, default=128,
+                        help="Padded sequence length for --tokenizer.")
+    parser.add_argument("--shard-size", type=int, default=None,
+                        help="Write the train set as shards of this many examples across a process pool (numpy engine).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes for --shard-size.")
+    parser.add_argument("--concat", action="store_true",
+                        help="Concatenate train shards into {m}_train.jsonl and remove them.")
     args = parser.parse_args()
 
-    random.seed(args.seed)
-    m = args.max_remove
+    if args.moves:
+        args.moves = tuple(sorted(set(int(x) for x in args.moves.split(","))))
+        args.max_remove = args.moves[-1]
+        if is_contiguous(args.moves):
+            args.moves = None
+    if args.max_remove is None:
+        parser.error("one of --max-remove or --moves is required")
+    if args.moves and args.exact:
+        parser.error("--exact enumerates {1..max_remove} games only")
+    args.prefix = str(args.max_remove) if not args.moves else "moves" + "-".join(str(x) for x in args.moves)
+    if args.label_weights:
+        if args.exact or (args.engine != "numpy" and not args.shard_size):
+            parser.error("--label-weights needs --engine numpy or --shard-size")
+        try:
+            args.label_weights = parse_label_weights(args.label_weights, args.max_remove, args.moves)
+        except ValueError:
+            parser.error(f"bad --label-weights {args.label_weights!r}")
+        args.prefix += "_balanced"
 
-    # ---- train set ----
-    train_dataset = []
-    for _ in range(args.n_train):
-        ex = generate_nim_example(m, max_coins)
-        train_dataset.append(ex)
-    random.shuffle(train_dataset)
-
-    train_filename = f"{m}_train.jsonl"
-    with open(train_filename, "w") as f:
-        for item in train_dataset:
-            f.write(json.dumps(item) + "\n")
-
-    # ---- eval set (no prompt overlap) ----
-    seen = set(item["prompt"] for item in train_dataset)
-    eval_dataset = []
-    count = 0
-    while count < args.n_eval:
-        ex = generate_nim_example(m, max_coins)
-        if ex["prompt"] in seen:
-            continue
-        eval_dataset.append(ex)
-        seen.add(ex["prompt"])
-        count += 1
-    random.shuffle(eval_dataset)
-
-    eval_filename = f"{m}_eval.jsonl"
-    with open(eval_filename, "w") as f:
-        for item in eval_dataset:
-            f.write(json.dumps(item) + "\n")
+    if not 0 < args.eval_fraction < 1:
+        parser.error("--eval-fraction must be between 0 and 1")
+    args.ext = f".{args.compress}" if args.compress else ""
 
-    print(f"Generated {train_filename} (n_train={args.n_train}), {eval_filename} (n_eval={args.n_eval})")
+    if args.shard_size:
+        generate_sharded(args)
+    elif args.exact:
+        generate_exact(args)
+    else:
+        generate_streaming(args)
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        from pretokenize import cached_tokenize
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        paths = [f"{args.prefix}_train.jsonl{args.ext}", f"{args.prefix}_eval.jsonl{args.ext}"]
+        if args.shard_size and not args.concat:
+            paths = sorted(glob.glob(f"{args.prefix}_train.shard*.jsonl{args.ext}")) + [f"{args.prefix}_eval.jsonl{args.ext}"]
+        for path in paths:
+            print(f"Pre-tokenized {path} into {cached_tokenize(path, tokenizer, args.max_length)}")
 
 
 if __name__ == "__main__":
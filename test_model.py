@@ -3,6 +3,8 @@ import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from tqdm import tqdm
 
+from nim_io import open_jsonl
+
 ckpt_path = "345-finetuned-final"
 eval_file = "data/345_changed.jsonl"
 
@@ -15,7 +17,7 @@ model.to(device)
 model.eval()
 
 # Load data
-with open(eval_file, 'r', encoding='utf-8') as f:
+with open_jsonl(eval_file) as f:
     data = [json.loads(line) for line in f]
 data = data[:1000]
 # Evaluation
@@ -54,7 +56,7 @@ print(f"\nManual Eval Accuracy: {accuracy:.4f} ({num_correct}/{len(data)})")
 # Save incorrect predictions
 incorrect_file = "incorrect_predictions.jsonl"
 count_incorrect = 0
-with open(incorrect_file, "w", encoding="utf-8") as f:
+with open_jsonl(incorrect_file, "w") as f:
     for ex in outputs:
         if not ex["correct"]:
             f.write(json.dumps(ex) + "\n")
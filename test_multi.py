@@ -5,6 +5,8 @@ from tqdm import tqdm
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import pandas as pd
 
+from nim_io import open_jsonl
+
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 ckpt_root = "nim-finetuned"
@@ -27,7 +29,7 @@ def evaluate_model(ckpt_path, data_file):
     model = AutoModelForCausalLM.from_pretrained(ckpt_path).to(device)
     model.eval()
 
-    with open(data_file, "r", encoding="utf-8") as f:
+    with open_jsonl(data_file) as f:
         data = [json.loads(line) for line in f]
 
     num_correct = 0
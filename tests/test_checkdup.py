@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from checkdup import normalize_prompt
+
+NUMOCC4_PROMPT = ("You are playing the game of nim. There are 365 coins.\n"
+                  "{a} and {b} are Player ONE and Player TWO, they take turns.\n"
+                  "Each player can take between 1 and 4 coins on their turn.\n\n"
+                  "So far:\n{a} take 4 coins.\n{b} take 2 coins.\n\n"
+                  "Now it's Player ONE's turn.")
+
+
+def test_ignore_names_player_one_header():
+    norm = normalize_prompt(NUMOCC4_PROMPT.format(a="Charles", b="Daniel"), ignore_names=True)
+    assert "Charles" not in norm and "Daniel" not in norm
+    assert "<P2> take 2 coins." in norm
+    assert norm == normalize_prompt(NUMOCC4_PROMPT.format(a="Eve", b="Frank"), ignore_names=True)
+
+
+def test_ignore_names_take_turns_header():
+    prompt = "Alice and Bob take turns.\nAlice take 1 coin.\nBob take 3 coins.\nNow it's Alice's turn."
+    assert normalize_prompt(prompt, ignore_names=True) == \
+        "<P1> and <P2> take turns.\n<P1> take 1 coin.\n<P2> take 3 coins.\nNow it's <P1>'s turn."
@@ -1,9 +1,14 @@
+import os
+import sys
 import json
 import re
-import math
 import matplotlib.pyplot as plt
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from wythoff_oracle import cold_positions, WythoffTable
+from nim_io import open_jsonl
+
 # Configuration
 INCORRECT_FILES = [
     "wythoff_errors_checkpoint-5000.jsonl",
@@ -23,16 +28,7 @@ NUM_COLD_POSITIONS = 100
 
 def compute_cold_positions(n):
     """Compute first n cold (losing) positions in Wythoff Nim."""
-    phi = (1 + 5 ** 0.5) / 2
-    cold = []
-    cold_set = set()
-    for k in range(n):
-        a = int(math.floor(k * phi))
-        b = int(math.floor(k * phi * phi))
-        cold.append((a, b))
-        cold_set.add((a, b))
-        cold_set.add((b, a))  # symmetric
-    return cold, cold_set
+    return cold_positions(n)  # exact integer Beatty table, no floating-point k*phi
 
 def parse_position(text):
     """Extract (a, b) from text like '(65, 187)' or '65 and 187'."""
@@ -98,7 +94,7 @@ def is_legal_move(start_a, start_b, move_a, move_b):
 # ============================================================================
 
 print("Loading evaluation data...")
-with open(EVAL_FILE, 'r') as f:
+with open_jsonl(EVAL_FILE) as f:
     eval_data = [json.loads(line) for line in f]
 
 # Build a map of starting positions to gold answers from eval
@@ -115,13 +111,15 @@ print(f"Loaded {len(eval_positions)} evaluation positions")
 
 # Compute cold positions
 print(f"Computing first {NUM_COLD_POSITIONS} cold positions...")
-cold_list, cold_set = compute_cold_positions(NUM_COLD_POSITIONS)
+cold_list = compute_cold_positions(NUM_COLD_POSITIONS)
 print(f"Computed {len(cold_list)} cold positions")
 
 # Identify which eval GOLD ANSWERS are cold (these are the positions we want the model to output)
+# The bitset table classifies every position, not just the first NUM_COLD_POSITIONS pairs
+cold_table = WythoffTable(max(max(pos) for pos in eval_gold_answers))
 eval_cold_answers = set()
 for gold_pos in eval_gold_answers:
-    if gold_pos in cold_set or (gold_pos[1], gold_pos[0]) in cold_set:
+    if cold_table.is_cold(*gold_pos):
         eval_cold_answers.add(gold_pos)
 
 print(f"Found {len(eval_cold_answers)} gold answers that are cold positions in eval set")
@@ -141,7 +139,7 @@ for incorrect_file in INCORRECT_FILES:
     ckpt_name = incorrect_file.replace("wythoff_errors_", "").replace(".jsonl", "")
     
     # Load incorrect predictions
-    with open(incorrect_file, 'r') as f:
+    with open_jsonl(incorrect_file) as f:
         incorrect_data = [json.loads(line) for line in f]
     
     print(f"Loaded {len(incorrect_data)} incorrect predictions")
@@ -0,0 +1,123 @@
+import os
+import sys
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from wythoff_oracle import WythoffTable, KIND_NAMES, COLD
+from nim_io import write_lines, external_shuffle, peak_rss_mb
+from nim_split import SPLIT_SALT, mix64_array, split_lines
+
+PROMPT = ("You are playing WNim with two piles.\n"
+          "The piles contain {x} and {y} coins.\n"
+          "On your move, you may remove any positive number from ONE pile,\n"
+          "{both_rule}\n"
+          "What is an optimal move? Answer as: (a,b).")
+
+
+def both_rule(k):
+    if k == 1:
+        return "or remove the SAME positive number from BOTH piles."
+    return f"or remove positive numbers from BOTH piles that differ by less than {k}."
+
+
+def position_hashes(x, y):
+    """State hash of the unordered position, so (x, y) and (y, x) land on the same side of the split."""
+    a, b = np.minimum(x, y).astype(np.uint64), np.maximum(x, y).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        return mix64_array(mix64_array(np.uint64(SPLIT_SALT) ^ a) ^ b)
+
+
+def sample_stratified(rng, table, batch_size, kind_weights, min_pile=0, max_rounds=1000):
+    """
+    Draw batch_size hot positions with move kinds in proportion kind_weights.
+
+    Positions are uniform within each move kind: candidates are drawn uniformly from
+    [min_pile, max_pile]^2 and kept until every kind's quota is full (rejection sampling).
+    Raises ValueError after max_rounds candidate batches, naming the kinds still short
+    (e.g. a kind with positive weight that no position in the range has).
+    """
+    weights = np.asarray(kind_weights, dtype=np.float64)
+    quota = rng.multinomial(batch_size, weights / weights.sum())
+    xs, ys = [], []
+    for _ in range(max_rounds):
+        if not quota.any():
+            break
+        x = rng.integers(min_pile, table.max_pile + 1, size=2 * batch_size)
+        y = rng.integers(min_pile, table.max_pile + 1, size=2 * batch_size)
+        _, _, kind = table.best_moves(x, y)
+        for k in np.flatnonzero(quota):
+            hit = np.flatnonzero(kind == k)[:quota[k]]
+            xs.append(x[hit])
+            ys.append(y[hit])
+            quota[k] -= len(hit)
+    else:
+        if quota.any():
+            short = ", ".join(f"{KIND_NAMES[k]} (weight {weights[k]:g}, {quota[k]} missing)" for k in np.flatnonzero(quota))
+            raise ValueError(f"could not fill move kind {short} from piles [{min_pile}, {table.max_pile}] "
+                             f"after {max_rounds} rounds of {2 * batch_size} candidates; set its weight to 0")
+    x, y = np.concatenate(xs), np.concatenate(ys)
+    order = rng.permutation(len(x))
+    return x[order], y[order]
+
+
+def generate_wythoff_examples(rng, table, kind_weights, batch_size=100000, min_pile=0):
+    """Endless stream of example dicts (prompt, answer, kind, state_hash)."""
+    rule = both_rule(table.k)
+    while True:
+        x, y = sample_stratified(rng, table, batch_size, kind_weights, min_pile)
+        new_a, new_b, kind = table.best_moves(x, y)
+        hashes = position_hashes(x, y)
+        for xi, yi, a, b, k, h in zip(x.tolist(), y.tolist(), new_a.tolist(), new_b.tolist(),
+                                      kind.tolist(), hashes.tolist()):
+            yield {
+                "prompt": PROMPT.format(x=xi, y=yi, both_rule=rule),
+                "answer": f"({a},{b})",
+                "kind": KIND_NAMES[k],
+                "state_hash": h,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Wythoff's game (WNim) prompts labelled with the textbook optimal move.")
+    parser.add_argument("--num-train", type=int, default=100000)
+    parser.add_argument("--num-eval", type=int, default=2000)
+    parser.add_argument("--max-pile", type=int, default=200)
+    parser.add_argument("--min-pile", type=int, default=0)
+    parser.add_argument("--k", type=int, default=1,
+                        help="k-Wythoff rule: take (x, y) from both piles with |x - y| < k (1 is the classic game)")
+    parser.add_argument("--kind-weights", type=str, default="1,1,1",
+                        help="relative share of reduce_larger, reduce_smaller and diagonal answers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="lines held in memory by the on-disk shuffle")
+    parser.add_argument("--out-prefix", type=str, default=None)
+    parser.add_argument("--compress", choices=["gz", "zst"], default=None, help="write .jsonl.gz / .jsonl.zst files")
+    args = parser.parse_args()
+
+    kind_weights = [float(w) for w in args.kind_weights.split(",")]
+    if len(kind_weights) != COLD:
+        parser.error(f"--kind-weights needs {COLD} values ({', '.join(KIND_NAMES[:COLD])})")
+    prefix = args.out_prefix or (f"wythoff{args.max_pile}" if args.k == 1 else f"wythoff_k{args.k}_{args.max_pile}")
+
+    rng = np.random.default_rng(args.seed)
+    table = WythoffTable(args.max_pile, args.k)
+    examples = generate_wythoff_examples(rng, table, kind_weights, args.batch_size, args.min_pile)
+
+    ext = f".{args.compress}" if args.compress else ""
+    train_file, eval_file = f"{prefix}_train.jsonl{ext}", f"{prefix}_eval.jsonl{ext}"
+    with tempfile.TemporaryFile("w+") as spool:
+        n_train = write_lines(train_file, external_shuffle(
+            split_lines(examples, args.num_train, args.num_eval, spool), args.seed, args.chunk_size))
+        spool.seek(0)
+        n_eval = write_lines(eval_file, external_shuffle(spool, args.seed + 1, args.chunk_size))
+    print(f"Wrote {n_train} train examples to {train_file}")
+    print(f"Wrote {n_eval} eval examples to {eval_file}")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import json
 import re
 import os
+import sys
 import torch
 from collections import Counter
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nim_io import open_jsonl
+
 ckpt_root = "/work/nvme/benv/lvillani/wythoffbase"
 eval_file = "wythoff_eval.jsonl"
 max_examples = None
@@ -18,7 +22,7 @@ def extract_pile_sizes(prompt):
     return None, None
 
 # Load evaluation data
-with open(eval_file, 'r', encoding='utf-8') as f:
+with open_jsonl(eval_file) as f:
     all_data = [json.loads(line) for line in f]
 if max_examples:
     data = all_data[:max_examples]
@@ -71,6 +75,6 @@ for ckpt_path in checkpoints:
 
     # Save incorrect predictions per checkpoint
     out_file = f"wythoff_errors_{name}.jsonl"
-    with open(out_file, 'w', encoding='utf-8') as fout:
+    with open_jsonl(out_file, 'w') as fout:
         for ex in outputs:
             fout.write(json.dumps(ex) + '\n')
\ No newline at end of file
@@ -0,0 +1,162 @@
+import re
+
+import numpy as np
+
+
+# Cold (P-)positions of k-Wythoff, where a move removes any positive number from one
+# pile or positive (x, y) from both piles with |x - y| < k, are (A_j, B_j) and
+# (B_j, A_j) with A_j = mex{A_i, B_i : i < j} and B_j = A_j + k*j. k = 1 is the
+# classic game (A_j = floor(j * phi)). Every positive integer is exactly one A_j or
+# one B_j, so a pile size alone determines the cold position it belongs to.
+
+# move kinds, in the order the textbook answer prefers them
+REDUCE_LARGER = 0   # (a, b) -> (a, partner(a)), a is one coordinate of a cold pair
+REDUCE_SMALLER = 1  # (a, b) -> (partner(b), b), b is the upper coordinate of a cold pair
+DIAGONAL = 2        # (a, b) -> (A_j, B_j), taking from both piles
+COLD = 3            # no winning move
+KIND_NAMES = ("reduce_larger", "reduce_smaller", "diagonal", "cold")
+
+
+def _isqrt(x):
+    """Exact floor(sqrt(x)) of an int64 array (x < 2**62)."""
+    s = np.floor(np.sqrt(x.astype(np.float64))).astype(np.int64)
+    for _ in range(2):
+        s -= s * s > x
+        s += (s + 1) * (s + 1) <= x
+    return s
+
+
+def beatty_lower(j, k=1):
+    """
+    A_j in exact integer arithmetic.
+
+    A_j = floor(j * alpha) with alpha = (2 - k + sqrt(k^2 + 4)) / 2, computed as
+    (j*(2 - k) + isqrt(j^2 * (k^2 + 4))) // 2; for k = 1 this is floor(j * phi).
+    """
+    j = np.asarray(j, dtype=np.int64)
+    return (j * (2 - k) + _isqrt(j * j * (k * k + 4))) // 2
+
+
+def cold_positions(n, k=1):
+    """First n cold positions (A_j, B_j), j = 0..n-1."""
+    js = np.arange(n, dtype=np.int64)
+    lower = beatty_lower(js, k)
+    return list(zip(lower.tolist(), (lower + k * js).tolist()))
+
+
+class WythoffTable:
+    """
+    Bit-packed P-position sieve answering "optimal move from (a, b)" in O(1) for piles up to max_pile.
+
+    Bit n of `words` is set when n is a lower coordinate A_j, and `ranks` holds the number
+    of set bits before each 64-bit word, so the index j of the cold pair containing n (and
+    with it partner(n)) is one popcount away. Memory is about 1.5 bits per pile value
+    (~2 MB for 10^7), against 8 bytes per value for a dense partner array.
+    """
+
+    def __init__(self, max_pile, k=1, chunk=1 << 20):
+        if k < 1:
+            raise ValueError(f"k-Wythoff needs k >= 1, got {k}")
+        self.max_pile = max_pile
+        self.k = k
+        n_words = max_pile // 64 + 1
+        bits = np.zeros(64 * n_words, dtype=bool)
+        for start in range(0, max_pile + 1, chunk):
+            lower = beatty_lower(np.arange(start, start + chunk), k)
+            bits[lower[lower <= max_pile]] = True
+            if lower[-1] > max_pile:
+                break
+        self.words = np.packbits(bits, bitorder="little").view("<u8")
+        del bits
+        self.ranks = np.zeros(n_words, dtype=np.uint32)
+        np.cumsum(np.bitwise_count(self.words[:-1]), out=self.ranks[1:])
+
+    def _count_lower(self, n):
+        """Number of lower coordinates in [0, n]."""
+        w = n >> 6
+        with np.errstate(over="ignore"):
+            mask = (np.uint64(2) << (n & 63).astype(np.uint64)) - np.uint64(1)  # wraps to all ones for bit 63
+        return self.ranks[w].astype(np.int64) + np.bitwise_count(self.words[w] & mask).astype(np.int64)
+
+    def is_lower(self, n):
+        n = np.asarray(n, dtype=np.int64)
+        return ((self.words[n >> 6] >> (n & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def pair_index(self, n):
+        """j of the cold pair (A_j, B_j) that contains n."""
+        n = np.asarray(n, dtype=np.int64)
+        below = self._count_lower(n)
+        return np.where(self.is_lower(n), below - 1, n - below + 1)
+
+    def partner(self, n):
+        """The other coordinate of the cold pair that contains n (partner(0) == 0)."""
+        n = np.asarray(n, dtype=np.int64)
+        j = self.pair_index(n)
+        return np.where(self.is_lower(n), n + self.k * j, n - self.k * j)
+
+    def is_cold(self, x, y):
+        return self.partner(np.minimum(x, y)) == np.maximum(x, y)
+
+    def _diagonal_targets(self, a, b):
+        """The (up to two) pair indices j with |(b - a) - k*j| < k, and whether (A_j, B_j) is reachable."""
+        d = b - a
+        j1 = d // self.k
+        j2 = j1 + 1
+        a1, a2 = beatty_lower(j1, self.k), beatty_lower(j2, self.k)
+        ok1 = a1 < a
+        ok2 = (d % self.k != 0) & (a2 < a) & (a2 + self.k * j2 < b)
+        return (j1, a1, ok1), (j2, a2, ok2)
+
+    def best_moves(self, x, y):
+        """
+        Textbook move for a batch of positions.
+
+        Piles are oriented as (a, b) = (min, max) and the result is the position after
+        the move in that orientation, plus its move kind. The move is the first that
+        applies of REDUCE_LARGER, REDUCE_SMALLER and DIAGONAL (lowest j first); cold
+        starts are returned unchanged with kind COLD.
+        """
+        x, y = np.asarray(x, dtype=np.int64), np.asarray(y, dtype=np.int64)
+        a, b = np.minimum(x, y), np.maximum(x, y)
+        pa, pb = self.partner(a), self.partner(b)
+        (j1, a1, ok1), (j2, a2, ok2) = self._diagonal_targets(a, b)
+        kind = np.select([pa < b, pb < a, ok1 | ok2], [REDUCE_LARGER, REDUCE_SMALLER, DIAGONAL], COLD)
+        da = np.where(ok1, a1, a2)
+        db = da + self.k * np.where(ok1, j1, j2)
+        new_a = np.select([kind == REDUCE_SMALLER, kind == DIAGONAL], [pb, da], a)
+        new_b = np.select([kind == REDUCE_LARGER, kind == DIAGONAL], [pa, db], b)
+        return new_a, new_b, kind
+
+    def best_move(self, x, y):
+        """Scalar best_moves: (new_a, new_b, kind)."""
+        new_a, new_b, kind = self.best_moves([x], [y])
+        return int(new_a[0]), int(new_b[0]), int(kind[0])
+
+    def winning_moves(self, x, y):
+        """Every winning move from (x, y) as (new_a, new_b, kind), in preference order; empty if (x, y) is cold."""
+        a, b = min(x, y), max(x, y)
+        moves = []
+        pa, pb = int(self.partner(a)), int(self.partner(b))
+        if pa < b:
+            moves.append((a, pa, REDUCE_LARGER))
+        if pb < a:
+            moves.append((pb, b, REDUCE_SMALLER))
+        for j, lower, ok in self._diagonal_targets(np.int64(a), np.int64(b)):
+            if ok:
+                moves.append((int(lower), int(lower + self.k * j), DIAGONAL))
+        return moves
+
+
+# reading positions back out of generated prompts
+PILES_RE = re.compile(r"The piles contain (\d+) and (\d+) coins")
+POSITION_RE = re.compile(r"\((\d+)\s*,\s*(\d+)\)")
+
+
+def extract_pile_sizes(prompt):
+    m = PILES_RE.search(prompt)
+    return (int(m.group(1)), int(m.group(2))) if m else (None, None)
+
+
+def parse_position(text):
+    m = POSITION_RE.search(text)
+    return (int(m.group(1)), int(m.group(2))) if m else (None, None)